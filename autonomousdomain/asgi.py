@@ -0,0 +1,18 @@
+"""
+ASGI config for autonomousdomain project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+from core.asgi import LongPollMiddleware
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "autonomousdomain.settings")
+
+application = LongPollMiddleware(get_asgi_application())
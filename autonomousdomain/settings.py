@@ -64,6 +64,7 @@ if SERVER_OBJECT_TYPE:
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -71,8 +72,13 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "core.middleware.JsonBodyMiddleware",
+    "core.middleware.ReplicaMiddleware",
 ]
 
+COMPRESSION_LEVEL = 6
+
+COMPRESSION_MIN_LENGTH = 1024
+
 ROOT_URLCONF = "autonomousdomain.urls"
 
 CONTEXT_PROCESSORS = [
@@ -96,6 +102,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "autonomousdomain.wsgi.application"
 
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "16"))
+
+LONG_POLL_INTERVAL = 0.5
+
+LONG_POLL_MAX_WAIT = 60
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -104,9 +116,115 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", "600")),
+        "OPTIONS": {"timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "20"))},
+        # A file rather than the in-memory default, so tests can exercise
+        # concurrent writers through separate connections.
+        "TEST": {"NAME": os.path.join(BASE_DIR, "test_db.sqlite3")},
     }
 }
 
+SHARD_DIR = os.getenv("SHARD_DIR", os.path.join(BASE_DIR, "shards"))
+
+SERVER_SHARD = os.getenv("SERVER_SHARD")
+
+if SERVER_SHARD:
+    DATABASES["shard"] = dict(
+        DATABASES["default"], NAME=os.path.join(SHARD_DIR, SERVER_SHARD)
+    )
+
+REPLICA_PATH = os.getenv("DATABASE_REPLICA")
+
+REPLICA_MAX_STALENESS = int(os.getenv("REPLICA_MAX_STALENESS", "30"))
+
+REPLICA_REFRESH_INTERVAL = 10
+
+if REPLICA_PATH:
+    DATABASES["replica"] = dict(
+        DATABASES["default"],
+        NAME="file:{}?mode=ro".format(REPLICA_PATH),
+        TEST={"MIRROR": "default"},
+    )
+
+DATABASE_ROUTERS = ["core.routers.ShardRouter", "core.routers.ReplicaRouter"]
+
+SQLITE_PRAGMAS = [
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "cache_size=-65536",
+    "mmap_size=268435456",
+    "temp_store=MEMORY",
+]
+
+SQLITE_LOCK_RETRIES = 5
+
+SQLITE_LOCK_RETRY_DELAY = 0.05
+
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+IDEMPOTENCY_PURGE_INTERVAL = 60
+
+QUERY_SHAPE_FLUSH_INTERVAL = 60
+
+JOB_MAX_ATTEMPTS = 3
+
+JOB_VISIBILITY_TIMEOUT = 5 * 60
+
+# Running jobs push their visibility timeout forward this often.
+JOB_HEARTBEAT_INTERVAL = 60
+
+JOB_RETRY_DELAY = 10
+
+JOB_RETENTION = 7 * 24 * 60 * 60
+
+JOB_PURGE_INTERVAL = 60
+
+SERVER_REGISTRY_TTL = 60
+
+# Sent by the central server and the servers it runs with every request
+# between them, and required by their replication and event endpoints.
+SERVER_API_TOKEN = os.getenv("SERVER_API_TOKEN") or SECRET_KEY
+
+SERVER_CLIENT_TIMEOUT = (3.05, 10)
+
+SERVER_CLIENT_RETRIES = 2
+
+SERVER_CLIENT_RETRY_DELAY = 0.1
+
+SERVER_CLIENT_POOL_SIZE = 10
+
+SERVER_CLIENT_CIRCUIT_THRESHOLD = 5
+
+SERVER_CLIENT_CIRCUIT_RESET = 30
+
+EVENT_MAX_BATCH = 1000
+
+EVENT_RETRY_AFTER = 5
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+RESPONSE_CACHE_LOCATION = os.getenv("RESPONSE_CACHE_LOCATION")
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
+if RESPONSE_CACHE_LOCATION:
+    CACHES["responses"].update(
+        {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": RESPONSE_CACHE_LOCATION,
+        }
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
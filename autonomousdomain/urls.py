@@ -13,6 +13,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -29,4 +30,5 @@ if settings.SERVER_OBJECT_TYPE:
 
 urlpatterns += [
     path("", include("server.urls")),
+    path("payments/", include("payments.urls")),
 ]
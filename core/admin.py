@@ -7,7 +7,18 @@ from core import models, forms
 for model in [
     model
     for model in Model.__subclasses__()
-    if model.__module__ == "core.models" and not model in [models.Barcode,]
+    if model.__module__ == "core.models"
+    and not model
+    in [
+        models.Barcode,
+        models.ChangeEvent,
+        models.IdempotencyKey,
+        models.Job,
+        models.QueryShape,
+        models.ReplicationState,
+        models.SearchEntry,
+        models.TableVersion,
+    ]
 ]:
     admin.site.register(
         model, type(model.__class__.__name__ + "Admin", (admin.ModelAdmin,), {}),
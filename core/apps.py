@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from core import changes, jobs, search, sqlite, versions
+
+        changes.connect_signals()
+        search.connect_signals()
+        sqlite.connect_signals()
+        versions.connect_signals()
+
+        jobs.autodiscover()
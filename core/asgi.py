@@ -0,0 +1,130 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.db import close_old_connections
+
+WAIT_PARAMETER = "wait"
+LONG_POLL_HEADER = (b"x-long-poll", b"1")
+VERSIONS_HEADER = "X-Long-Poll-Versions"
+
+
+def get_versions(labels):
+    from core.versions import get_versions
+
+    close_old_connections()
+    return get_versions(labels)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class LongPollMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.executors = {}
+
+    def get_executor(self, loop):
+        if loop not in self.executors:
+            self.executors[loop] = ThreadPoolExecutor(max_workers=settings.ASGI_THREADS)
+            loop.set_default_executor(self.executors[loop])
+        return self.executors[loop]
+
+    async def __call__(self, scope, receive, send):
+        self.get_executor(asyncio.get_event_loop())
+
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+
+        query = parse_qsl(scope["query_string"].decode("latin-1"), True)
+        wait = [value for key, value in query if key == WAIT_PARAMETER]
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        try:
+            wait = min(float(wait[-1]), settings.LONG_POLL_MAX_WAIT)
+        except ValueError:
+            wait = 0
+
+        scope = dict(
+            scope,
+            query_string=urlencode(
+                [(key, value) for key, value in query if key != WAIT_PARAMETER]
+            ).encode("latin-1"),
+            headers=[*scope["headers"], LONG_POLL_HEADER],
+        )
+
+        request_messages = []
+        while not request_messages or request_messages[-1].get("more_body"):
+            request_messages.append(await receive())
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + wait
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+
+        try:
+            while True:
+                messages = await self.get_response(scope, request_messages)
+                versions = self.pop_versions(messages[0])
+
+                if messages[0]["status"] != 304 or not versions:
+                    break
+
+                # Only the table versions behind the ETag are polled; the view
+                # runs again once one of them moves.
+                labels = [label for label, _ in versions]
+                while (
+                    loop.time() < deadline
+                    and await loop.run_in_executor(None, get_versions, labels)
+                    == versions
+                ):
+                    await asyncio.wait(
+                        {disconnected}, timeout=settings.LONG_POLL_INTERVAL
+                    )
+                    if disconnected.done():
+                        return
+
+                if loop.time() >= deadline:
+                    break
+        finally:
+            disconnected.cancel()
+
+        for message in messages:
+            await send(message)
+
+    def pop_versions(self, start_message):
+        name = VERSIONS_HEADER.lower().encode("latin-1")
+        values = [
+            value for key, value in start_message["headers"] if key.lower() == name
+        ]
+        start_message["headers"] = [
+            header for header in start_message["headers"] if header[0].lower() != name
+        ]
+
+        if not values:
+            return None
+
+        versions = []
+        for pair in values[0].decode("latin-1").split(","):
+            label, _, version = pair.partition("=")
+            versions.append((label, int(version)))
+        return versions
+
+    async def get_response(self, scope, request_messages):
+        pending_messages = list(request_messages)
+        messages = []
+
+        async def receive():
+            if pending_messages:
+                return pending_messages.pop(0)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.app(scope, receive, send)
+
+        return messages
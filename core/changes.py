@@ -0,0 +1,196 @@
+import json
+from collections import defaultdict
+
+from django.apps import apps
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from core import search, shards
+from core.models import (
+    ChangeEvent,
+    IdempotencyKey,
+    Job,
+    QueryShape,
+    ReplicationState,
+    SearchEntry,
+    TableVersion,
+)
+
+CENTRAL = "central"
+
+IGNORED_MODELS = (
+    ChangeEvent,
+    IdempotencyKey,
+    Job,
+    QueryShape,
+    ReplicationState,
+    SearchEntry,
+    TableVersion,
+)
+
+
+class SequenceMismatch(Exception):
+    def __init__(self, sequence):
+        super().__init__("Replica is at sequence {}.".format(sequence))
+        self.sequence = sequence
+
+
+def is_captured(model):
+    return (
+        model._meta.app_label == "core"
+        and not model._meta.auto_created
+        and model not in IGNORED_MODELS
+    )
+
+
+def serialize(instance: models.Model):
+    return json.dumps(
+        serializers.serialize("python", [instance])[0]["fields"],
+        cls=DjangoJSONEncoder,
+    )
+
+
+def capture(instance: models.Model, action):
+    ChangeEvent.objects.create(
+        label=instance._meta.label_lower,
+        object_id=instance.pk,
+        action=action,
+        data=serialize(instance),
+    )
+
+
+def to_change(event: ChangeEvent):
+    return {
+        "sequence": event.pk,
+        "model": event.label,
+        "pk": event.object_id,
+        "action": event.action,
+        "fields": json.loads(event.data),
+    }
+
+
+def get_model(label):
+    try:
+        model = apps.get_model(label)
+    except (LookupError, ValueError):
+        model = None
+
+    if model is None or not is_captured(model):
+        raise ValueError("{} is not a replicated model.".format(label))
+    return model
+
+
+def apply_change(change, using):
+    model = get_model(change["model"])
+
+    if change["action"] == ChangeEvent.DELETE:
+        model.objects.using(using).filter(pk=change["pk"]).delete()
+        return
+
+    if change["action"] != ChangeEvent.SAVE:
+        raise ValueError("Unknown action {}.".format(change["action"]))
+
+    for deserialized_object in serializers.deserialize(
+        "python",
+        [{"model": change["model"], "pk": change["pk"], "fields": change["fields"]}],
+        using=using,
+    ):
+        deserialized_object.save(using=using)
+
+
+def apply_changes(using, source, after, through, changes):
+    # Rows can arrive before the rows they reference were replicated, or
+    # reference rows this replica never holds.
+    with connections[using].constraint_checks_disabled():
+        with transaction.atomic(using=using):
+            state, _ = ReplicationState.objects.using(using).get_or_create(
+                source=source
+            )
+            if state.sequence != after:
+                raise SequenceMismatch(state.sequence)
+
+            saved = defaultdict(list)
+            for change in changes:
+                apply_change(change, using)
+                if change["action"] == ChangeEvent.SAVE:
+                    saved[change["model"]].append(change["pk"])
+
+            # Raw saves skip the search signals, so the shard's search entries
+            # are brought up to date here.
+            for label, pks in saved.items():
+                search.reindex(get_model(label), pks, using)
+
+            state.sequence = through
+            state.save(using=using, update_fields=["sequence"])
+
+    return state.sequence
+
+
+# Moving a row to another shard is captured as a delete of the row where it
+# was, so the shard it leaves drops it.
+def capture_move(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, **kwargs):
+    if raw or using != DEFAULT_DB_ALIAS or instance.pk is None:
+        return
+    if sender not in shards.SHARD_KEYS:
+        return
+
+    attname = sender._meta.get_field(shards.SHARD_KEYS[sender]).attname
+    previous = (
+        sender.objects.filter(pk=instance.pk)
+        .exclude(**{attname: getattr(instance, attname)})
+        .first()
+    )
+    if previous is not None:
+        capture(previous, ChangeEvent.DELETE)
+
+
+def capture_save(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, **kwargs):
+    if not raw and using == DEFAULT_DB_ALIAS and is_captured(sender):
+        capture(instance, ChangeEvent.SAVE)
+
+
+def capture_delete(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if using == DEFAULT_DB_ALIAS and is_captured(sender):
+        capture(instance, ChangeEvent.DELETE)
+
+
+def get_forward_field(model, through):
+    for field in model._meta.many_to_many:
+        if field.remote_field.through is through:
+            return field.name
+
+
+def capture_m2m(sender, instance, action, reverse, model, pk_set, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear") and is_captured(
+            type(instance)
+        ):
+            capture(instance, ChangeEvent.SAVE)
+        return
+
+    if not is_captured(model):
+        return
+
+    if action == "pre_clear":
+        instance._change_pks = list(
+            model.objects.filter(
+                **{get_forward_field(model, sender): instance}
+            ).values_list("pk", flat=True)
+        )
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if action == "post_clear":
+            pk_set = getattr(instance, "_change_pks", [])
+        for related in model.objects.filter(pk__in=pk_set):
+            capture(related, ChangeEvent.SAVE)
+
+
+def connect_signals():
+    pre_save.connect(capture_move)
+    post_save.connect(capture_save)
+    post_delete.connect(capture_delete)
+    m2m_changed.connect(capture_m2m)
@@ -0,0 +1,120 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http.response import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+django_json_encoder = DjangoJSONEncoder()
+
+
+def default(o):
+    if isinstance(o, dict):
+        return dict(o)
+    if isinstance(o, (list, tuple)):
+        return list(o)
+    if isinstance(o, str):
+        return str(o)
+    return django_json_encoder.default(o)
+
+
+class Encoder:
+    content_type: str = None
+
+    def encode(self, data) -> bytes:
+        raise NotImplementedError
+
+
+class JSONEncoder(Encoder):
+    content_type = "application/json"
+
+    def encode(self, data):
+        if orjson is not None:
+            return orjson.dumps(
+                data,
+                default=default,
+                option=orjson.OPT_PASSTHROUGH_SUBCLASS
+                | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        return json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8")
+
+
+class MessagePackEncoder(Encoder):
+    content_type = "application/msgpack"
+
+    def encode(self, data):
+        return msgpack.packb(data, default=default, use_bin_type=True)
+
+
+class ColumnarJSONEncoder(JSONEncoder):
+    content_type = "application/vnd.autonomousdomain.columnar+json"
+
+    def encode(self, data):
+        if isinstance(data.get("data"), list):
+            data = dict(data, data=to_columns(data["data"]))
+        return super().encode(data)
+
+
+def to_columns(rows):
+    columns = {}
+
+    for row in rows:
+        for column in row:
+            columns.setdefault(column, None)
+
+    return {
+        "columns": list(columns),
+        "values": [[row.get(column) for row in rows] for column in columns],
+    }
+
+
+encoders = {}
+
+
+def register(encoder: Encoder):
+    encoders[encoder.content_type] = encoder
+
+
+def get_encoder(accept: str):
+    accepted = []
+
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            accepted.append((-quality, len(accepted), media_type))
+
+    for _, _, media_type in sorted(accepted):
+        if media_type in encoders:
+            return encoders[media_type]
+
+    return encoders[JSONEncoder.content_type]
+
+
+class EncodedResponse(HttpResponse):
+    def __init__(self, data, encoder: Encoder = None, **kwargs):
+        if encoder is None:
+            encoder = encoders[JSONEncoder.content_type]
+        kwargs.setdefault("content_type", encoder.content_type)
+        super().__init__(content=encoder.encode(data), **kwargs)
+
+
+register(JSONEncoder())
+register(ColumnarJSONEncoder())
+
+if msgpack is not None:
+    register(MessagePackEncoder())
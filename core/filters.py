@@ -0,0 +1,411 @@
+from collections import namedtuple
+from functools import lru_cache
+from typing import Type
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Avg, Count, Max, Min, Prefetch, Sum
+
+ORDERING_PARAMETER = "ordering"
+LOOKUP_SEPARATOR = "__"
+PATH_SEPARATOR = "."
+LIST_SEPARATOR = ","
+
+HIDDEN_FIELDS = ("password",)
+GROUP_BY_PARAMETER = "group_by"
+COUNT_ALL = "*"
+
+AGGREGATES = {"count": Count, "sum": Sum, "min": Min, "max": Max, "avg": Avg}
+NUMERIC_AGGREGATES = ("sum", "avg")
+NUMERIC_FIELDS = (
+    models.IntegerField,
+    models.DecimalField,
+    models.FloatField,
+)
+
+QueryPlan = namedtuple(
+    "QueryPlan",
+    [
+        "filters",
+        "select_related",
+        "prefetch_related",
+        "only",
+        "values",
+        "order_by",
+        "fields",
+    ],
+)
+Filter = namedtuple("Filter", ["key", "lookup", "convert"])
+Projection = namedtuple("Projection", ["only", "select_related", "prefetch_related"])
+PrefetchPlan = namedtuple("PrefetchPlan", ["lookup", "model", "projection"])
+AggregationPlan = namedtuple("AggregationPlan", ["group_by", "annotations"])
+
+
+class FilterError(ValueError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def get_fields(model: Type[models.Model]):
+    return {field.name: field for field in model._meta.get_fields()}
+
+
+def is_single_valued(field):
+    return field.is_relation and (field.many_to_one or field.one_to_one)
+
+
+def get_accessor_name(field):
+    if field.auto_created and not field.concrete:
+        return field.get_accessor_name()
+    return field.name
+
+
+@lru_cache(maxsize=None)
+def resolve_path(model: Type[models.Model], path: str):
+    split_path = path.split(PATH_SEPARATOR)
+    fields = get_fields(model)
+    field = None
+
+    for depth, part in enumerate(split_path):
+        if part in HIDDEN_FIELDS or part not in fields:
+            raise FilterError(
+                "Unknown field {!r} in {!r} on {}.".format(
+                    part, path, model._meta.label
+                )
+            )
+
+        field = fields[part]
+
+        if depth < len(split_path) - 1:
+            if not field.is_relation or field.related_model is None:
+                raise FilterError(
+                    "Field {!r} in {!r} is not a relation.".format(part, path)
+                )
+            fields = get_fields(field.related_model)
+
+    return split_path, field
+
+
+def get_value_field(field):
+    if field.is_relation:
+        return field.related_model._meta.pk
+    return field
+
+
+def to_python(field, key, value):
+    try:
+        return get_value_field(field).to_python(value)
+    except ValidationError as e:
+        raise FilterError(
+            "Invalid value {!r} for {!r}: {}".format(value, key, " ".join(e.messages))
+        )
+
+
+def to_boolean(field, key, value):
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    raise FilterError("Invalid boolean {!r} for {!r}.".format(value, key))
+
+
+def to_list(field, key, value):
+    return [to_python(field, key, item) for item in value.split(LIST_SEPARATOR) if item]
+
+
+def to_range(field, key, value):
+    values = value.split(LIST_SEPARATOR)
+    if len(values) != 2:
+        raise FilterError("Range {!r} for {!r} must be two values.".format(value, key))
+    return [to_python(field, key, item) for item in values]
+
+
+def to_string(field, key, value):
+    return value
+
+
+LOOKUPS = {
+    "exact": to_python,
+    "iexact": to_string,
+    "contains": to_string,
+    "icontains": to_string,
+    "startswith": to_string,
+    "istartswith": to_string,
+    "endswith": to_string,
+    "iendswith": to_string,
+    "gt": to_python,
+    "gte": to_python,
+    "lt": to_python,
+    "lte": to_python,
+    "in": to_list,
+    "range": to_range,
+    "isnull": to_boolean,
+}
+
+
+# Paths may use Django's "__" as well as ".", so "fulfillment_center__name"
+# is read as "fulfillment_center.name".
+def split_key(key: str):
+    parts = key.split(LOOKUP_SEPARATOR)
+    lookup = parts.pop() if len(parts) > 1 and parts[-1] in LOOKUPS else "exact"
+    return PATH_SEPARATOR.join(parts), lookup
+
+
+def compile_filter(model: Type[models.Model], key: str):
+    path, lookup = split_key(key)
+    split_path, field = resolve_path(model, path)
+
+    if field.is_relation and field.related_model is None:
+        raise FilterError("Field {!r} cannot be filtered on.".format(path))
+
+    convert = LOOKUPS[lookup]
+
+    return Filter(
+        key=key,
+        lookup=LOOKUP_SEPARATOR.join(split_path + [lookup]),
+        convert=lambda value: convert(field, key, value),
+    )
+
+
+def compile_ordering(model: Type[models.Model], ordering: str):
+    descending = ordering.startswith("-")
+    split_path, field = resolve_path(model, split_key(ordering.lstrip("-"))[0])
+
+    if field.is_relation and not is_single_valued(field):
+        raise FilterError("Cannot order by {!r}.".format(ordering))
+
+    return ("-" if descending else "") + LOOKUP_SEPARATOR.join(split_path)
+
+
+@lru_cache(maxsize=1024)
+def get_dependencies(model: Type[models.Model], paths: tuple):
+    dependencies = [model]
+
+    for path in paths:
+        split_path = split_key(path.lstrip("-"))[0].split(PATH_SEPARATOR)
+
+        for depth in range(len(split_path)):
+            try:
+                _, field = resolve_path(
+                    model, PATH_SEPARATOR.join(split_path[: depth + 1])
+                )
+            except FilterError:
+                break
+
+            if field.is_relation and field.related_model not in (None, *dependencies):
+                dependencies.append(field.related_model)
+
+    return tuple(dependencies)
+
+
+def split_fields(fields):
+    field_tree = {}
+
+    for field in fields:
+        name, _, nested_field = field.partition(PATH_SEPARATOR)
+        field_tree.setdefault(name, [])
+        if nested_field:
+            field_tree[name].append(nested_field)
+
+    return field_tree
+
+
+def prefix_projection(prefix, projection: Projection):
+    return Projection(
+        only=[prefix + LOOKUP_SEPARATOR + name for name in projection.only],
+        select_related=[
+            prefix + LOOKUP_SEPARATOR + name for name in projection.select_related
+        ],
+        prefetch_related=[
+            prefetch_plan._replace(
+                lookup=prefix + LOOKUP_SEPARATOR + prefetch_plan.lookup
+            )
+            for prefetch_plan in projection.prefetch_related
+        ],
+    )
+
+
+@lru_cache(maxsize=1024)
+def compile_projection(model: Type[models.Model], fields: tuple):
+    only = [model._meta.pk.name]
+    select_related = []
+    prefetch_related = []
+
+    model_fields = get_fields(model)
+
+    for name, nested_fields in split_fields(fields).items():
+        field = model_fields[name]
+        nested_fields = tuple(nested_fields)
+
+        if not field.is_relation:
+            only.append(name)
+        elif field.related_model is None:
+            only.extend([field.ct_field, field.fk_field])
+        elif is_single_valued(field):
+            if field.concrete:
+                only.append(name)
+            select_related.append(name)
+
+            projection = prefix_projection(
+                name, compile_projection(field.related_model, nested_fields)
+            )
+            only.extend(projection.only)
+            select_related.extend(projection.select_related)
+            prefetch_related.extend(projection.prefetch_related)
+        else:
+            projection = compile_projection(field.related_model, nested_fields)
+            if field.one_to_many:
+                projection = projection._replace(
+                    only=projection.only + (field.field.name,)
+                )
+
+            prefetch_related.append(
+                PrefetchPlan(
+                    lookup=get_accessor_name(field),
+                    model=field.related_model,
+                    projection=projection,
+                )
+            )
+
+    return Projection(
+        only=tuple(dict.fromkeys(only)),
+        select_related=tuple(select_related),
+        prefetch_related=tuple(prefetch_related),
+    )
+
+
+def get_values(model: Type[models.Model], fields: tuple):
+    model_fields = get_fields(model)
+
+    if not fields or any(
+        PATH_SEPARATOR in field or model_fields[field].is_relation for field in fields
+    ):
+        return ()
+
+    return tuple(name for name in model_fields if name in fields)
+
+
+def apply_projection(queryset, projection: Projection):
+    if projection.select_related:
+        queryset = queryset.select_related(*projection.select_related)
+
+    if projection.prefetch_related:
+        queryset = queryset.prefetch_related(
+            *[
+                get_prefetch(prefetch_plan)
+                for prefetch_plan in projection.prefetch_related
+            ]
+        )
+
+    return queryset.only(*projection.only)
+
+
+def get_prefetch(prefetch_plan: PrefetchPlan):
+    return Prefetch(
+        prefetch_plan.lookup,
+        queryset=apply_projection(
+            prefetch_plan.model.objects.all(), prefetch_plan.projection
+        ),
+    )
+
+
+@lru_cache(maxsize=1024)
+def compile_query_plan(
+    model: Type[models.Model], keys: tuple, ordering: tuple, fields: tuple
+):
+    filters = tuple(compile_filter(model, key) for key in keys)
+
+    for field in fields:
+        resolve_path(model, field)
+
+    projection = compile_projection(model, fields)
+
+    return QueryPlan(
+        filters=filters,
+        select_related=projection.select_related,
+        prefetch_related=projection.prefetch_related,
+        only=projection.only,
+        values=get_values(model, fields),
+        order_by=tuple(compile_ordering(model, term) for term in ordering),
+        fields=fields,
+    )
+
+
+# Every parameter but the ordering is a filter. Lists are not paginated, so
+# ?limit and ?page are unknown fields rather than silently ignored.
+def get_query_plan(model: Type[models.Model], request_data, fields=None):
+    ordering = request_data.get(ORDERING_PARAMETER, "")
+
+    return compile_query_plan(
+        model,
+        tuple(sorted(key for key in request_data if key != ORDERING_PARAMETER)),
+        tuple(term for term in ordering.split(LIST_SEPARATOR) if term),
+        tuple(fields or ()),
+    )
+
+
+def is_allowed(path: str, allowed: tuple):
+    return not allowed or any(
+        field == path or field.startswith(path + PATH_SEPARATOR) for field in allowed
+    )
+
+
+def compile_aggregate_path(model: Type[models.Model], path: str, allowed: tuple):
+    if not is_allowed(path, allowed):
+        raise FilterError("Field {!r} is not available.".format(path))
+
+    split_path, field = resolve_path(model, path)
+
+    if field.is_relation and not is_single_valued(field):
+        raise FilterError("Cannot aggregate over {!r}.".format(path))
+
+    return LOOKUP_SEPARATOR.join(split_path), field
+
+
+@lru_cache(maxsize=1024)
+def compile_aggregation(
+    model: Type[models.Model], group_by: tuple, aggregates: tuple, allowed: tuple
+):
+    group_by = tuple(
+        (path, compile_aggregate_path(model, path, allowed)[0]) for path in group_by
+    )
+
+    annotations = []
+    for name, path in aggregates:
+        if name not in AGGREGATES:
+            raise FilterError("Unknown aggregate {!r}.".format(name))
+
+        if name == "count" and path == COUNT_ALL:
+            annotations.append((name, Count(model._meta.pk.name)))
+            continue
+
+        lookup, field = compile_aggregate_path(model, path, allowed)
+        if name in NUMERIC_AGGREGATES and not isinstance(field, NUMERIC_FIELDS):
+            raise FilterError("Cannot {} non-numeric field {!r}.".format(name, path))
+
+        annotations.append((path + LOOKUP_SEPARATOR + name, AGGREGATES[name](lookup)))
+
+    if not annotations:
+        raise FilterError("No aggregates requested.")
+
+    return AggregationPlan(group_by=group_by, annotations=tuple(annotations))
+
+
+def get_aggregation_plan(model: Type[models.Model], request_data, allowed=None):
+    return compile_aggregation(
+        model,
+        tuple(
+            path
+            for value in request_data.getlist(GROUP_BY_PARAMETER)
+            for path in value.split(LIST_SEPARATOR)
+            if path
+        ),
+        tuple(
+            (name, path)
+            for name in AGGREGATES
+            for value in request_data.getlist(name)
+            for path in value.split(LIST_SEPARATOR)
+            if path
+        ),
+        tuple(allowed or ()),
+    )
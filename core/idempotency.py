@@ -0,0 +1,72 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http.response import HttpResponse
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+
+purged_at = 0
+
+
+def get_fingerprint(request, body: bytes):
+    return hashlib.md5(
+        b"\n".join([request.method.encode(), request.content_type.encode(), body])
+    ).hexdigest()
+
+
+def purge_expired():
+    global purged_at
+
+    if time.monotonic() - purged_at < settings.IDEMPOTENCY_PURGE_INTERVAL:
+        return
+
+    purged_at = time.monotonic()
+    IdempotencyKey.objects.filter(expires__lt=timezone.now()).delete()
+
+
+def claim(key, path, fingerprint):
+    queryset = IdempotencyKey.objects.filter(key=key, path=path)
+
+    record = queryset.first()
+    if record is not None and record.expires >= timezone.now():
+        return record
+
+    purge_expired()
+    queryset.filter(expires__lt=timezone.now()).delete()
+
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                key=key,
+                path=path,
+                fingerprint=fingerprint,
+                expires=timezone.now()
+                + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return None
+    except IntegrityError:
+        return queryset.first()
+
+
+def store(key, path, response: HttpResponse):
+    IdempotencyKey.objects.filter(key=key, path=path).update(
+        status=response.status_code,
+        content=response.content,
+        content_type=response.get("Content-Type", ""),
+        location=response.get("Location", ""),
+    )
+
+
+def replay(record: IdempotencyKey):
+    response = HttpResponse(
+        bytes(record.content), status=record.status, content_type=record.content_type
+    )
+    if record.location:
+        response["Location"] = record.location
+    response["Idempotent-Replayed"] = "true"
+
+    return response
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core import metrics
+from core.models import Job
+from core.sqlite import retry_on_locked
+
+tasks = {}
+
+purged_at = 0
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+class Heartbeat(threading.Thread):
+    """
+    Calls beat every interval seconds while the block it guards runs, so work
+    that outlasts its claim's timeout keeps its claim.
+    """
+
+    def __init__(self, beat, interval):
+        super().__init__(daemon=True)
+        self.beat = beat
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.beat()
+                except DatabaseError:
+                    metrics.increment("heartbeats.errors")
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.join()
+
+
+def get_name(func):
+    return "{}.{}".format(func.__module__, func.__qualname__)
+
+
+def task(func):
+    tasks[get_name(func)] = func
+    return func
+
+
+def autodiscover():
+    autodiscover_modules("tasks")
+
+
+def enqueue(func, args=(), kwargs=None, priority=0, delay=0, max_attempts=None):
+    name = func if isinstance(func, str) else get_name(func)
+    if name not in tasks:
+        raise UnknownTask("Unknown task {!r}.".format(name))
+
+    return Job.objects.create(
+        name=name,
+        arguments=json.dumps({"args": list(args), "kwargs": kwargs or {}}),
+        priority=priority,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        available_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+@retry_on_locked
+def claim_next():
+    claim = uuid.uuid4().hex
+    now = timezone.now()
+
+    claimable = Job.objects.filter(
+        status__in=(Job.QUEUED, Job.RUNNING),
+        available_at__lte=now,
+        attempts__lt=F("max_attempts"),
+    )
+    Job.objects.filter(
+        pk__in=claimable.order_by("-priority", "available_at", "pk").values("pk")[:1]
+    ).filter(status__in=(Job.QUEUED, Job.RUNNING), available_at__lte=now).update(
+        status=Job.RUNNING,
+        claim=claim,
+        attempts=F("attempts") + 1,
+        available_at=now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT),
+    )
+
+    return Job.objects.filter(claim=claim).first()
+
+
+@retry_on_locked
+def extend(job: Job):
+    return Job.objects.filter(pk=job.pk, claim=job.claim).update(
+        available_at=timezone.now() + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+    )
+
+
+@retry_on_locked
+def finish(job: Job, **fields):
+    return Job.objects.filter(pk=job.pk, claim=job.claim).update(claim="", **fields)
+
+
+def get_retry_delay(job: Job):
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+
+
+def run(job: Job):
+    func = tasks.get(job.name)
+    started = time.perf_counter()
+
+    try:
+        if func is None:
+            raise UnknownTask("Unknown task {!r}.".format(job.name))
+        arguments = json.loads(job.arguments or "{}")
+        with Heartbeat(lambda: extend(job), settings.JOB_HEARTBEAT_INTERVAL):
+            func(*arguments.get("args", []), **arguments.get("kwargs", {}))
+    except Exception:
+        error = traceback.format_exc()
+
+        if func is not None and job.attempts < job.max_attempts:
+            finish(
+                job,
+                status=Job.QUEUED,
+                error=error,
+                available_at=timezone.now() + get_retry_delay(job),
+            )
+            metrics.increment("jobs.retried")
+        else:
+            finish(job, status=Job.FAILED, error=error, finished=timezone.now())
+            metrics.increment("jobs.failed")
+        return False
+    finally:
+        metrics.increment("jobs.seconds", time.perf_counter() - started)
+
+    finish(job, status=Job.DONE, error="", finished=timezone.now())
+    metrics.increment("jobs.done")
+    return True
+
+
+def fail_abandoned():
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        available_at__lt=timezone.now(),
+        attempts__gte=F("max_attempts"),
+    ).update(
+        status=Job.FAILED,
+        claim="",
+        error="Visibility timeout expired.",
+        finished=timezone.now(),
+    )
+
+
+def purge_finished():
+    global purged_at
+
+    if time.monotonic() - purged_at < settings.JOB_PURGE_INTERVAL:
+        return
+
+    purged_at = time.monotonic()
+    fail_abandoned()
+    Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished__lt=timezone.now() - timedelta(seconds=settings.JOB_RETENTION),
+    ).delete()
@@ -0,0 +1,214 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections, models, router, transaction
+
+from core import shapes
+from core.filters import LIST_SEPARATOR, LOOKUP_SEPARATOR
+from core.models import QueryShape
+
+EQUALITY_LOOKUPS = ("exact", "in", "isnull")
+RANGE_LOOKUPS = ("gt", "gte", "lt", "lte", "range")
+
+
+class Rollback(Exception):
+    pass
+
+
+def split_lookup(lookup):
+    path, _, name = lookup.rpartition(LOOKUP_SEPARATOR)
+    return path, name
+
+
+def get_sample_value(model, lookup):
+    path, name = split_lookup(lookup)
+
+    if name == "isnull":
+        return False
+
+    value = (
+        model.objects.exclude(**{path + "__isnull": True})
+        .values_list(path, flat=True)
+        .first()
+    )
+    if value is None:
+        value = ""
+
+    if name == "in":
+        return [value]
+    if name == "range":
+        return [value, value]
+    return value
+
+
+def get_queryset(model, filters, ordering):
+    return model.objects.filter(
+        **{lookup: get_sample_value(model, lookup) for lookup in filters}
+    ).order_by(*ordering)
+
+
+def get_local_field(model, path):
+    if LOOKUP_SEPARATOR in path:
+        return None
+
+    field = model._meta.get_field(path)
+    if not field.concrete or field.many_to_many:
+        return None
+    return field.name
+
+
+def get_index_fields(model, filters, ordering):
+    equality = []
+    ranges = []
+
+    for lookup in filters:
+        path, name = split_lookup(lookup)
+        field = get_local_field(model, path)
+        if field is None:
+            continue
+        if name in EQUALITY_LOOKUPS:
+            equality.append(field)
+        elif name in RANGE_LOOKUPS:
+            ranges.append(field)
+
+    fields = equality + ranges[:1]
+
+    descending = [term.startswith("-") for term in ordering]
+    if not ranges and len(set(descending)) < 2:
+        for term in ordering:
+            field = get_local_field(model, term.lstrip("-"))
+            if field is None:
+                break
+            fields.append(term)
+
+    return list(dict.fromkeys(fields))
+
+
+def explain(queryset):
+    return [line.split(" ", 3)[-1] for line in queryset.explain().splitlines()]
+
+
+def needs_index(model, plan):
+    for detail in plan:
+        if detail == "USE TEMP B-TREE FOR ORDER BY":
+            return True
+
+        # SQLite before 3.36 reports "SCAN TABLE name".
+        words = detail.split()
+        if words[:2] == ["SCAN", "TABLE"]:
+            del words[1]
+        if words[:2] == ["SCAN", model._meta.db_table] and "USING" not in words:
+            return True
+    return False
+
+
+def measure(queryset, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.values_list("pk", flat=True))
+        timings.append(time.perf_counter() - started)
+
+    return min(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Explain the most frequent filter and ordering shapes seen by the REST "
+        "API and propose indexes for the ones that scan or sort."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--min-count", type=int, default=1)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        shapes.flush()
+
+        proposals = {}
+
+        for shape in QueryShape.objects.filter(
+            count__gte=options["min_count"]
+        ).order_by("-count")[: options["top"]]:
+            try:
+                model = apps.get_model(shape.label)
+            except LookupError:
+                continue
+
+            index = self.advise(model, shape, options["repeat"])
+            if index is not None:
+                proposals.setdefault(model, {})[tuple(index.fields)] = index
+
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS("No indexes to propose."))
+            return
+
+        self.stdout.write("\nAdd to Meta.indexes and run makemigrations:")
+        for model, indexes in proposals.items():
+            self.stdout.write("\n{}:".format(model._meta.label))
+            for index in indexes.values():
+                self.stdout.write(
+                    "    models.Index(fields={!r}, name={!r}),".format(
+                        index.fields, index.name
+                    )
+                )
+
+    def advise(self, model, shape, repeat):
+        filters = [lookup for lookup in shape.filters.split(LIST_SEPARATOR) if lookup]
+        ordering = [term for term in shape.ordering.split(LIST_SEPARATOR) if term]
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                "{} ({} requests) filter=[{}] ordering=[{}]".format(
+                    model._meta.label, shape.count, shape.filters, shape.ordering
+                )
+            )
+        )
+
+        queryset = get_queryset(model, filters, ordering)
+        plan = explain(queryset)
+        self.stdout.write("  plan: {}".format("; ".join(plan)))
+
+        if not needs_index(model, plan):
+            self.stdout.write("  uses an index.")
+            return None
+
+        fields = get_index_fields(model, filters, ordering)
+        if not fields:
+            self.stdout.write("  no local fields to index.")
+            return None
+
+        index = models.Index(fields=fields)
+        index.set_name_with_model(model)
+
+        before = measure(queryset, repeat)
+        after, after_plan = self.try_index(model, index, queryset, repeat)
+
+        self.stdout.write("  proposed: {} on {}".format(index.name, fields))
+        self.stdout.write("  plan with index: {}".format("; ".join(after_plan)))
+        self.stdout.write("  {:.2f} ms -> {:.2f} ms".format(before, after))
+
+        if needs_index(model, after_plan) and after >= before:
+            self.stdout.write("  index does not help.")
+            return None
+        return index
+
+    def try_index(self, model, index, queryset, repeat):
+        using = router.db_for_write(model)
+        connection = connections[using]
+
+        try:
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        str(index.create_sql(model, connection.schema_editor()))
+                    )
+                result = measure(queryset, repeat), explain(queryset)
+                raise Rollback
+        except Rollback:
+            pass
+
+        return result
@@ -0,0 +1,67 @@
+import decimal
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import encoders
+from core.middleware import CompressionMiddleware, compress_sequence
+
+
+def get_sample_export(rows):
+    return {
+        "data": [
+            {
+                "article_number": "ART-{:08d}".format(i),
+                "price": decimal.Decimal("19.95") + i % 100,
+                "price_old": decimal.Decimal("24.95") + i % 100,
+                "sales_channel": {"name": "Online shop {}".format(i % 3)},
+                "supplier": {"name": "Supplier {}".format(i % 25)},
+            }
+            for i in range(rows)
+        ],
+        "error": None,
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure bytes and time saved by compressing sample article exports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+
+    def handle(self, *args, **options):
+        export = get_sample_export(options["rows"])
+
+        self.stdout.write(
+            "{:<48} {:>8} {:>12} {:>8} {:>10}".format(
+                "content type", "coding", "bytes", "ratio", "ms"
+            )
+        )
+
+        for content_type, encoder in encoders.encoders.items():
+            started = time.perf_counter()
+            content = encoder.encode(export)
+            encoded = time.perf_counter() - started
+
+            self.stdout.write(
+                "{:<48} {:>8} {:>12} {:>8.3f} {:>10.1f}".format(
+                    content_type, "identity", len(content), 1, encoded * 1000
+                )
+            )
+
+            for coding, wbits in CompressionMiddleware.WBITS.items():
+                for level in options["levels"]:
+                    started = time.perf_counter()
+                    compressed = b"".join(compress_sequence([content], wbits, level))
+                    compressed_in = time.perf_counter() - started
+
+                    self.stdout.write(
+                        "{:<48} {:>8} {:>12} {:>8.3f} {:>10.1f}".format(
+                            content_type,
+                            "{}-{}".format(coding, level),
+                            len(compressed),
+                            len(compressed) / len(content),
+                            (encoded + compressed_in) * 1000,
+                        )
+                    )
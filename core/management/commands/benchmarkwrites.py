@@ -0,0 +1,98 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from core import metrics
+from core.sqlite import retry_on_locked
+
+TABLE = "core_benchmarkwrite"
+
+
+@retry_on_locked
+def write(thread, rows, read_first):
+    with transaction.atomic(), connection.cursor() as cursor:
+        if read_first:
+            cursor.execute(
+                "SELECT COUNT(*) FROM {} WHERE thread = %s".format(TABLE), [thread]
+            )
+        cursor.executemany(
+            "INSERT INTO {} (thread, value) VALUES (%s, %s)".format(TABLE),
+            [(thread, "x" * 64)] * rows,
+        )
+
+
+class Command(BaseCommand):
+    help = "Measure concurrent write throughput and lock contention on the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--transactions", type=int, default=500)
+        parser.add_argument("--rows", type=int, default=1)
+        parser.add_argument("--read-first", action="store_true")
+
+    def run_thread(self, thread, options, latencies, failures):
+        try:
+            for _ in range(options["transactions"]):
+                started = time.perf_counter()
+                try:
+                    write(thread, options["rows"], options["read_first"])
+                except OperationalError:
+                    failures.append(thread)
+                    continue
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS {} "
+                "(id INTEGER PRIMARY KEY, thread INTEGER, value TEXT)".format(TABLE)
+            )
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+        connection.close()
+
+        latencies = []
+        failures = []
+        lock_retries = metrics.snapshot().get("sqlite.lock_retries", 0)
+
+        threads = [
+            threading.Thread(
+                target=self.run_thread, args=(thread, options, latencies, failures)
+            )
+            for thread in range(options["threads"])
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE {}".format(TABLE))
+
+        latencies.sort()
+        self.stdout.write(
+            "journal_mode={} threads={} transactions={} rows={} read_first={}".format(
+                journal_mode,
+                options["threads"],
+                len(latencies),
+                options["rows"],
+                options["read_first"],
+            )
+        )
+        self.stdout.write(
+            "{:.0f} transactions/s, p50 {:.2f} ms, p99 {:.2f} ms, "
+            "{} lock retries, {} failed".format(
+                len(latencies) / elapsed,
+                latencies[len(latencies) // 2] * 1000 if latencies else 0,
+                latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+                metrics.snapshot().get("sqlite.lock_retries", 0) - lock_retries,
+                len(failures),
+            )
+        )
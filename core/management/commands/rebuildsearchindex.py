@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the article number and barcode search index."
+
+    def handle(self, *args, **options):
+        for model in search.indexes:
+            with transaction.atomic(using=router.db_for_write(model)):
+                search.rebuild_index(model)
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Indexed {}.".format(model._meta.verbose_name_plural)
+                )
+            )
@@ -0,0 +1,47 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "Copy the primary database into the read replica with SQLite's backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=settings.REPLICA_REFRESH_INTERVAL
+        )
+        parser.add_argument("--once", action="store_true")
+
+    def refresh(self):
+        started = time.time()
+
+        connection = connections[DEFAULT_DB_ALIAS]
+        connection.ensure_connection()
+
+        replica = sqlite3.connect(settings.REPLICA_PATH)
+        try:
+            connection.connection.backup(replica)
+        finally:
+            replica.close()
+
+        # Readers judge staleness by the replica's mtime, which has to be the
+        # moment the copied snapshot was taken, not when copying finished.
+        os.utime(settings.REPLICA_PATH, (started, started))
+
+        return time.time() - started
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_PATH:
+            raise CommandError("DATABASE_REPLICA is not set.")
+
+        while True:
+            elapsed = self.refresh()
+            self.stdout.write("Refreshed replica in {:.2f}s.".format(elapsed))
+
+            if options["once"]:
+                return
+            time.sleep(max(options["interval"] - elapsed, 0))
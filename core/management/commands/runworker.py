@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def run_process(options):
+    return Command().run_threads(options)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs with a pool of worker threads or processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument("--sleep", type=float, default=1.0)
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["processes"] > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["processes"]) as executor:
+                processed = sum(
+                    executor.map(run_process, [options] * options["processes"])
+                )
+        else:
+            processed = self.run_threads(options)
+
+        self.stdout.write(self.style.SUCCESS("Processed {} jobs.".format(processed)))
+
+    def run_threads(self, options):
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            return sum(
+                executor.map(
+                    lambda _: self.run_loop(options["sleep"], options["once"]),
+                    range(options["threads"]),
+                )
+            )
+
+    def run_loop(self, sleep, once):
+        processed = 0
+
+        try:
+            while True:
+                job = jobs.claim_next()
+
+                if job is None:
+                    jobs.purge_finished()
+                    if once:
+                        return processed
+                    time.sleep(sleep)
+                    continue
+
+                started = time.perf_counter()
+                succeeded = jobs.run(job)
+                processed += 1
+
+                self.stdout.write(
+                    "#{} {} {} (attempt {}/{}) in {:.2f}s.".format(
+                        job.pk,
+                        job.name,
+                        "done" if succeeded else "failed",
+                        job.attempts,
+                        job.max_attempts,
+                        time.perf_counter() - started,
+                    )
+                )
+        finally:
+            connections.close_all()
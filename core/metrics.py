@@ -0,0 +1,15 @@
+import threading
+from collections import defaultdict
+
+lock = threading.Lock()
+counters = defaultdict(int)
+
+
+def increment(name: str, value=1):
+    with lock:
+        counters[name] += value
+
+
+def snapshot():
+    with lock:
+        return dict(counters)
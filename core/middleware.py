@@ -1,12 +1,260 @@
+import codecs
 import json
+import zlib
+from io import BytesIO
 
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
 from django.http.request import HttpRequest
+from django.http.response import HttpResponseBase
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from core import routers
+
+JSON_METHODS = ("POST", "PUT", "PATCH")
+CHUNK_SIZE = 64 * 1024
+
+
+def get_max_body_size(request: HttpRequest):
+    max_body_size = None
+
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is not None:
+        view_class = getattr(resolver_match.func, "view_class", None)
+        view_initkwargs = getattr(resolver_match.func, "view_initkwargs", {})
+        max_body_size = view_initkwargs.get(
+            "max_body_size", getattr(view_class, "max_body_size", None)
+        )
+
+    if max_body_size is None:
+        max_body_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+    return max_body_size
+
+
+def check_content_length(request: HttpRequest, max_body_size):
+    if (
+        max_body_size is not None
+        and int(request.META.get("CONTENT_LENGTH") or 0) > max_body_size
+    ):
+        raise RequestDataTooBig(
+            "Request body exceeded {} bytes for {}.".format(max_body_size, request.path)
+        )
+
+
+def read_chunks(request: HttpRequest, max_body_size):
+    check_content_length(request, max_body_size)
+
+    size = 0
+    while True:
+        chunk = request.read(CHUNK_SIZE)
+        if not chunk:
+            return
+
+        size += len(chunk)
+        if max_body_size is not None and size > max_body_size:
+            raise RequestDataTooBig(
+                "Request body exceeded {} bytes for {}.".format(
+                    max_body_size, request.path
+                )
+            )
+
+        yield chunk
+
+
+def read_body(request: HttpRequest):
+    if not hasattr(request, "_body"):
+        body = b"".join(read_chunks(request, get_max_body_size(request)))
+        request._body = body
+        request._stream = BytesIO(body)
+    return request._body
+
+
+class MalformedBody(ValueError):
+    pass
+
+
+def parse_json_body(request: HttpRequest):
+    try:
+        return json.loads(read_body(request))
+    except ValueError as e:
+        raise MalformedBody("Request body is not valid JSON: {}".format(e))
+
+
+def iter_json_array(request: HttpRequest):
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(request.encoding or "utf-8")()
+    chunks = read_chunks(request, get_max_body_size(request))
+    buffer = ""
+    expecting = "["
+    final = False
+
+    while not final:
+        chunk = next(chunks, None)
+        final = chunk is None
+        buffer += text_decoder.decode(chunk or b"", final=final)
+        position = 0
+
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position == len(buffer):
+                break
+
+            character = buffer[position]
+
+            if expecting == "[":
+                if character != "[":
+                    raise ValueError("Request body is not a JSON array.")
+                expecting = "first"
+                position += 1
+                continue
+
+            if expecting == "end":
+                raise ValueError("Unexpected data after the JSON array.")
+
+            if expecting in ("first", ",") and character == "]":
+                expecting = "end"
+                position += 1
+                continue
+
+            if expecting == ",":
+                if character != ",":
+                    raise ValueError("Expected ',' or ']' in the JSON array.")
+                expecting = "item"
+                position += 1
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if final:
+                    raise
+                break
+
+            # A number at the end of the buffer may continue in the next chunk.
+            if (
+                end == len(buffer)
+                and not final
+                and not isinstance(item, (dict, list, str))
+            ):
+                break
+
+            position = end
+            expecting = ","
+            yield item
+
+        buffer = buffer[position:]
+
+    if expecting != "end":
+        raise ValueError("Request body is not a complete JSON array.")
 
 
 class JsonBodyMiddleware(MiddlewareMixin):
     def process_request(self, request: HttpRequest):
-        if request.method in ("POST", "PUT") and request.content_type.startswith(
+        if request.method in JSON_METHODS and request.content_type.startswith(
             "application/json"
         ):
-            setattr(request, "POST", json.loads(request.body))
+            setattr(request, "POST", SimpleLazyObject(lambda: parse_json_body(request)))
+            setattr(request, "iter_json_array", lambda: iter_json_array(request))
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    def process_request(self, request: HttpRequest):
+        if request.method in ("GET", "HEAD") and routers.is_replica_fresh():
+            request._replica_token = routers.use_replica.set(True)
+
+    def process_response(self, request: HttpRequest, response: HttpResponseBase):
+        if hasattr(request, "_replica_token"):
+            routers.use_replica.reset(request._replica_token)
+            del request._replica_token
+        return response
+
+
+def parse_accept_encoding(accept_encoding: str):
+    qualities = {}
+
+    for coding in accept_encoding.split(","):
+        name, *params = [part.strip().lower() for part in coding.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name] = quality
+
+    return qualities
+
+
+def compress_sequence(sequence, wbits, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    for item in sequence:
+        data = compressor.compress(item) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+    def get_content_coding(self, request: HttpRequest):
+        qualities = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+
+        candidates = [
+            (qualities.get(coding, qualities.get("*", 0.0)), coding)
+            for coding in self.WBITS
+        ]
+        quality, coding = max(candidates, key=lambda candidate: candidate[0])
+
+        return coding if quality > 0 else None
+
+    def process_response(self, request: HttpRequest, response: HttpResponseBase):
+        if response.has_header("Content-Encoding") or response.status_code == 304:
+            return response
+
+        level = getattr(request, "compression_level", settings.COMPRESSION_LEVEL)
+        min_length = getattr(
+            request, "compression_min_length", settings.COMPRESSION_MIN_LENGTH
+        )
+
+        if level == 0:
+            return response
+
+        if not response.streaming and len(response.content) < min_length:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        coding = self.get_content_coding(request)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content, self.WBITS[coding], level
+            )
+            del response["Content-Length"]
+        else:
+            compressed_content = b"".join(
+                compress_sequence([response.content], self.WBITS[coding], level)
+            )
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = coding
+
+        return response
@@ -0,0 +1,82 @@
+# Generated by Django 3.0.1 on 2019-12-21 10:14
+
+import sqlite3
+
+from django.db import migrations, models
+
+
+FTS_TABLE_SQL = [
+    "CREATE VIRTUAL TABLE core_searchentry_fts USING fts5("
+    "text, content='core_searchentry', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER core_searchentry_fts_insert AFTER INSERT ON core_searchentry BEGIN "
+    "INSERT INTO core_searchentry_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER core_searchentry_fts_delete AFTER DELETE ON core_searchentry BEGIN "
+    "INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER core_searchentry_fts_update AFTER UPDATE ON core_searchentry BEGIN "
+    "INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO core_searchentry_fts(rowid, text) VALUES (new.id, new.text); END",
+]
+
+DROP_FTS_TABLE_SQL = [
+    "DROP TRIGGER IF EXISTS core_searchentry_fts_insert",
+    "DROP TRIGGER IF EXISTS core_searchentry_fts_delete",
+    "DROP TRIGGER IF EXISTS core_searchentry_fts_update",
+    "DROP TABLE IF EXISTS core_searchentry_fts",
+]
+
+
+def create_fts_table(apps, schema_editor):
+    # The trigram tokenizer ships with SQLite 3.34.0 and later; older builds fall
+    # back to LIKE lookups on core_searchentry in core.search.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        return
+
+    for sql in FTS_TABLE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    for sql in DROP_FTS_TABLE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("label", models.CharField(max_length=255)),
+                ("object_id", models.PositiveIntegerField()),
+                ("text", models.TextField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="searchentry",
+            constraint=models.UniqueConstraint(
+                fields=("label", "object_id"),
+                name="core_searchentry_label_object_id_unique",
+            ),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_searchentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TableVersion",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("label", models.CharField(max_length=255, unique=True)),
+                ("version", models.BigIntegerField(default=0)),
+                ("modified", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_changeevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueryShape",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("label", models.CharField(max_length=255)),
+                ("filters", models.TextField(blank=True)),
+                ("ordering", models.TextField(blank=True)),
+                ("count", models.BigIntegerField(default=0)),
+                ("last_seen", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="queryshape",
+            constraint=models.UniqueConstraint(
+                fields=("label", "filters", "ordering"),
+                name="core_queryshape_label_filters_ordering_unique",
+            ),
+        ),
+    ]
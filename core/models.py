@@ -209,3 +209,129 @@ class SalesChannelSupplierArticle(models.Model):
         return "{} ({}, {})".format(
             self.article_number, self.sales_channel, self.supplier,
         )
+
+
+class SearchEntry(models.Model):
+    label = models.CharField(max_length=255)
+    object_id = models.PositiveIntegerField()
+    text = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["label", "object_id"],
+                name="core_searchentry_label_object_id_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return "{} #{}".format(self.label, self.object_id)
+
+
+class TableVersion(models.Model):
+    label = models.CharField(max_length=255, unique=True)
+    version = models.BigIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "{} v{}".format(self.label, self.version)
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=32)
+    status = models.PositiveSmallIntegerField(null=True)
+    content = models.BinaryField(default=b"")
+    content_type = models.CharField(max_length=255, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    expires = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key", "path"], name="core_idempotencykey_key_path_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return "{} {}".format(self.path, self.key)
+
+
+class ChangeEvent(models.Model):
+    SAVE = "save"
+    DELETE = "delete"
+
+    ACTIONS = ((SAVE, SAVE), (DELETE, DELETE))
+
+    label = models.CharField(max_length=255)
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=255, choices=ACTIONS)
+    data = models.TextField(blank=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "#{} {} {} #{}".format(self.pk, self.action, self.label, self.object_id)
+
+
+class ReplicationState(models.Model):
+    source = models.CharField(max_length=255, unique=True)
+    sequence = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return "{} #{}".format(self.source, self.sequence)
+
+
+class QueryShape(models.Model):
+    label = models.CharField(max_length=255)
+    filters = models.TextField(blank=True)
+    ordering = models.TextField(blank=True)
+    count = models.BigIntegerField(default=0)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["label", "filters", "ordering"],
+                name="core_queryshape_label_filters_ordering_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return "{} [{}] [{}]".format(self.label, self.filters, self.ordering)
+
+
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUSES = (
+        (QUEUED, QUEUED),
+        (RUNNING, RUNNING),
+        (DONE, DONE),
+        (FAILED, FAILED),
+    )
+
+    name = models.CharField(max_length=255)
+    arguments = models.TextField(blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=255, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    available_at = models.DateTimeField()
+    claim = models.CharField(max_length=32, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "available_at"], name="core_job_status_available"
+            ),
+        ]
+
+    def __str__(self):
+        return "#{} {} ({})".format(self.pk, self.name, self.status)
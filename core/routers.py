@@ -0,0 +1,66 @@
+import contextvars
+import os
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.shards import SHARD_DATABASE, is_shard_model
+
+REPLICA_DATABASE = "replica"
+
+use_replica = contextvars.ContextVar("use_replica", default=False)
+
+
+def is_replica_fresh():
+    if REPLICA_DATABASE not in settings.DATABASES:
+        return False
+
+    try:
+        refreshed = os.stat(settings.REPLICA_PATH).st_mtime
+    except OSError:
+        return False
+
+    return time.time() - refreshed <= settings.REPLICA_MAX_STALENESS
+
+
+class ShardRouter:
+    def get_database(self, model):
+        if SHARD_DATABASE in settings.DATABASES and is_shard_model(model):
+            return SHARD_DATABASE
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self.get_database(model)
+
+    def db_for_write(self, model, **hints):
+        return self.get_database(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_shard_model(type(obj1)) or is_shard_model(type(obj2)):
+            return True
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if use_replica.get() and REPLICA_DATABASE in settings.DATABASES:
+            return REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db == REPLICA_DATABASE:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = (DEFAULT_DB_ALIAS, REPLICA_DATABASE)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DATABASE:
+            return False
+        return None
@@ -0,0 +1,184 @@
+from typing import Type
+
+from django.db import connections, models, router
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from core.models import (
+    Barcode,
+    FulfillmentCenterArticle,
+    SalesChannelSupplierArticle,
+    SearchEntry,
+)
+
+FTS_TABLE = "core_searchentry_fts"
+TRIGRAM_LENGTH = 3
+
+indexes = {
+    FulfillmentCenterArticle: lambda instance: [instance.article_number]
+    + [barcode.barcode for barcode in instance.barcodes.all()],
+    SalesChannelSupplierArticle: lambda instance: [instance.article_number],
+}
+
+related_models = {
+    FulfillmentCenterArticle: (Barcode, FulfillmentCenterArticle.barcodes.through),
+}
+
+fts_table_cache = {}
+
+
+def has_fts_table(using):
+    connection = connections[using]
+
+    if connection.vendor != "sqlite":
+        return False
+
+    if using not in fts_table_cache:
+        fts_table_cache[using] = FTS_TABLE in connection.introspection.table_names()
+    return fts_table_cache[using]
+
+
+def is_indexed(model: Type[models.Model]):
+    return model in indexes
+
+
+def get_dependencies(model: Type[models.Model]):
+    return (SearchEntry, *related_models.get(model, ()))
+
+
+def index_instance(instance: models.Model):
+    model = type(instance)
+
+    SearchEntry.objects.using(instance._state.db).update_or_create(
+        label=model._meta.label_lower,
+        object_id=instance.pk,
+        defaults={"text": "\n".join(indexes[model](instance))},
+    )
+
+
+def unindex_instance(instance: models.Model):
+    SearchEntry.objects.using(instance._state.db).filter(
+        label=type(instance)._meta.label_lower, object_id=instance.pk
+    ).delete()
+
+
+def reindex(model: Type[models.Model], pks, using):
+    # For rows saved without search signals, such as replication's raw saves.
+    if model is Barcode:
+        model, pks = (
+            FulfillmentCenterArticle,
+            FulfillmentCenterArticle.objects.using(using)
+            .filter(barcodes__in=pks)
+            .values_list("pk", flat=True),
+        )
+    if not is_indexed(model):
+        return
+
+    queryset = model.objects.using(using).filter(pk__in=list(pks))
+    if model is FulfillmentCenterArticle:
+        queryset = queryset.prefetch_related("barcodes")
+
+    for instance in queryset:
+        index_instance(instance)
+
+
+def rebuild_index(model: Type[models.Model], using=None):
+    using = using or router.db_for_write(model)
+
+    SearchEntry.objects.using(using).filter(label=model._meta.label_lower).delete()
+
+    queryset = model.objects.using(using)
+    if model is FulfillmentCenterArticle:
+        queryset = queryset.prefetch_related("barcodes")
+
+    SearchEntry.objects.using(using).bulk_create(
+        (
+            SearchEntry(
+                label=model._meta.label_lower,
+                object_id=instance.pk,
+                text="\n".join(indexes[model](instance)),
+            )
+            for instance in queryset.iterator(chunk_size=2000)
+        ),
+        batch_size=500,
+    )
+
+
+def search(model: Type[models.Model], query: str, limit=50):
+    label = model._meta.label_lower
+    using = router.db_for_read(model)
+
+    if len(query) < TRIGRAM_LENGTH or not has_fts_table(using):
+        return list(
+            SearchEntry.objects.using(using)
+            .filter(label=label, text__contains=query)
+            .order_by("object_id")
+            .values_list("object_id", flat=True)[:limit]
+        )
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT core_searchentry.object_id FROM {fts_table} "
+            "INNER JOIN core_searchentry ON core_searchentry.id = {fts_table}.rowid "
+            "WHERE {fts_table} MATCH %s AND core_searchentry.label = %s "
+            "ORDER BY {fts_table}.rank LIMIT %s".format(fts_table=FTS_TABLE),
+            ['"{}"'.format(query.replace('"', '""')), label, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def update_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_instance(instance)
+
+
+def remove_from_index(sender, instance, **kwargs):
+    unindex_instance(instance)
+
+
+def update_barcode_articles(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    for article in instance.fulfillment_center_barcodes.all():
+        index_instance(article)
+
+
+def collect_barcode_articles(sender, instance, **kwargs):
+    instance._search_article_pks = list(
+        instance.fulfillment_center_barcodes.values_list("pk", flat=True)
+    )
+
+
+def update_collected_barcode_articles(sender, instance, **kwargs):
+    for article in FulfillmentCenterArticle.objects.filter(
+        pk__in=getattr(instance, "_search_article_pks", [])
+    ):
+        index_instance(article)
+
+
+def update_article_barcodes(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            index_instance(instance)
+        return
+
+    if action == "pre_clear":
+        collect_barcode_articles(sender, instance)
+    elif action == "post_clear":
+        update_collected_barcode_articles(sender, instance)
+    elif action in ("post_add", "post_remove"):
+        for article in FulfillmentCenterArticle.objects.filter(pk__in=pk_set):
+            index_instance(article)
+
+
+def connect_signals():
+    for model in indexes:
+        post_save.connect(update_index, sender=model)
+        post_delete.connect(remove_from_index, sender=model)
+
+    post_save.connect(update_barcode_articles, sender=Barcode)
+    pre_delete.connect(collect_barcode_articles, sender=Barcode)
+    post_delete.connect(update_collected_barcode_articles, sender=Barcode)
+    m2m_changed.connect(
+        update_article_barcodes, sender=FulfillmentCenterArticle.barcodes.through
+    )
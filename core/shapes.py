@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import Counter
+from typing import Type
+
+from django.conf import settings
+from django.db import DatabaseError, connections, models
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+from core.filters import LIST_SEPARATOR, QueryPlan
+from core.models import QueryShape
+
+lock = threading.Lock()
+pending = Counter()
+flusher = None
+
+
+def get_shape(model: Type[models.Model], query_plan: QueryPlan):
+    return (
+        model._meta.label_lower,
+        LIST_SEPARATOR.join(
+            sorted(condition.lookup for condition in query_plan.filters)
+        ),
+        LIST_SEPARATOR.join(query_plan.order_by),
+    )
+
+
+def record(model: Type[models.Model], query_plan: QueryPlan):
+    if not query_plan.filters and not query_plan.order_by:
+        return
+
+    global flusher
+
+    # Requests only count shapes; a background thread writes them out.
+    with lock:
+        pending[get_shape(model, query_plan)] += 1
+        if flusher is None:
+            flusher = threading.Thread(target=run_flusher, daemon=True)
+            flusher.start()
+
+
+def run_flusher():
+    while True:
+        time.sleep(settings.QUERY_SHAPE_FLUSH_INTERVAL)
+        try:
+            flush()
+        except DatabaseError:
+            metrics.increment("query_shapes.errors")
+        finally:
+            connections.close_all()
+
+
+def flush():
+    with lock:
+        shapes = dict(pending)
+        pending.clear()
+
+    for (label, filters, ordering), count in shapes.items():
+        queryset = QueryShape.objects.filter(
+            label=label, filters=filters, ordering=ordering
+        )
+        if not queryset.update(count=F("count") + count, last_seen=timezone.now()):
+            QueryShape.objects.get_or_create(
+                label=label, filters=filters, ordering=ordering
+            )
+            queryset.update(count=F("count") + count, last_seen=timezone.now())
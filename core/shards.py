@@ -0,0 +1,101 @@
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core import search
+from core.models import (
+    Barcode,
+    DeliveryCenter,
+    FulfillmentCenter,
+    FulfillmentCenterArticle,
+    Warehouse,
+)
+
+SHARD_DATABASE = "shard"
+
+SHARD_MODELS = (
+    Barcode,
+    FulfillmentCenterArticle,
+    FulfillmentCenterArticle.barcodes.through,
+)
+SHARD_LABELS = tuple(model._meta.label_lower for model in SHARD_MODELS)
+
+# Rows referenced by shard rows; a shard holds only those its rows reference.
+REFERENCED_MODELS = (Warehouse, DeliveryCenter, FulfillmentCenter, Barcode)
+
+# Shard rows follow this field; changing it moves the row to another shard.
+SHARD_KEYS = {FulfillmentCenterArticle: "fulfillment_center"}
+
+FULFILLMENT_CENTER_LOOKUPS = {
+    "warehouse": "warehouse",
+    "delivery_center": "delivery_center",
+    "fulfillment_center": "pk",
+}
+
+
+def is_shard_model(model):
+    return model._meta.label_lower in SHARD_LABELS
+
+
+def add_database(alias, name):
+    connections.databases[alias] = dict(
+        connections.databases[DEFAULT_DB_ALIAS], NAME=name
+    )
+
+
+def get_fulfillment_centers(server_type, object_id, using=DEFAULT_DB_ALIAS):
+    if server_type not in FULFILLMENT_CENTER_LOOKUPS:
+        return FulfillmentCenter.objects.using(using).none()
+
+    return FulfillmentCenter.objects.using(using).filter(
+        **{FULFILLMENT_CENTER_LOOKUPS[server_type]: object_id}
+    )
+
+
+def get_shard_querysets(server_type, object_id, using=DEFAULT_DB_ALIAS):
+    through = FulfillmentCenterArticle.barcodes.through
+
+    fulfillment_centers = get_fulfillment_centers(server_type, object_id, using=using)
+    articles = FulfillmentCenterArticle.objects.using(using).filter(
+        fulfillment_center__in=fulfillment_centers
+    )
+    links = through.objects.using(using).filter(fulfillmentcenterarticle__in=articles)
+
+    # Referenced rows are copied along so foreign keys hold inside the shard.
+    return [
+        Warehouse.objects.using(using).filter(
+            pk__in=fulfillment_centers.values("warehouse")
+        ),
+        DeliveryCenter.objects.using(using).filter(
+            pk__in=fulfillment_centers.values("delivery_center")
+        ),
+        fulfillment_centers,
+        Barcode.objects.using(using).filter(pk__in=links.values("barcode")),
+        articles,
+        links,
+    ]
+
+
+def provision(alias, server_type, object_id, batch_size=500):
+    querysets = get_shard_querysets(server_type, object_id)
+    connection = connections[alias]
+    counts = {}
+
+    with transaction.atomic(using=alias):
+        # Raw deletes, so search and version signals never fire for shard rows.
+        with connection.cursor() as cursor:
+            for queryset in reversed(querysets):
+                cursor.execute(
+                    "DELETE FROM {}".format(
+                        connection.ops.quote_name(queryset.model._meta.db_table)
+                    )
+                )
+
+        for queryset in querysets:
+            objects = queryset.model.objects.using(alias).bulk_create(
+                queryset.order_by("pk").iterator(chunk_size=2000),
+                batch_size=batch_size,
+            )
+            counts[queryset.model._meta.label] = len(objects)
+
+        search.rebuild_index(FulfillmentCenterArticle, using=alias)
+
+    return counts
@@ -0,0 +1,51 @@
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.backends.signals import connection_created
+
+from core import metrics
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for pragma in settings.SQLITE_PRAGMAS:
+            cursor.execute("PRAGMA {}".format(pragma))
+
+
+def is_locked_error(error: OperationalError):
+    return "database is locked" in str(error) or "database is busy" in str(error)
+
+
+def retry_on_locked(func):
+    # The busy timeout covers waiting for a lock, but a transaction that read
+    # before writing fails immediately when another writer got there first.
+    # Such transactions can only be retried as a whole.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.SQLITE_LOCK_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if (
+                    not is_locked_error(e)
+                    or connection.in_atomic_block
+                    or attempt == settings.SQLITE_LOCK_RETRIES - 1
+                ):
+                    raise
+
+            metrics.increment("sqlite.lock_retries")
+            time.sleep(
+                settings.SQLITE_LOCK_RETRY_DELAY * 2**attempt * random.uniform(0.5, 1.5)
+            )
+
+    return wrapper
+
+
+def connect_signals():
+    connection_created.connect(configure_connection)
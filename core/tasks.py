@@ -0,0 +1,13 @@
+from django.apps import apps
+from django.db import router, transaction
+
+from core import search
+from core.jobs import task
+
+
+@task
+def rebuild_search_index(label):
+    model = apps.get_model(label)
+
+    with transaction.atomic(using=router.db_for_write(model)):
+        search.rebuild_index(model)
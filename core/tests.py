@@ -1,3 +1,1130 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+
+from core import encoders, jobs, metrics, routers, search, shapes
+from core.asgi import VERSIONS_HEADER, LongPollMiddleware
+from core.management.commands.adviseindexes import needs_index
+from core.middleware import ReplicaMiddleware
+from core.singleflight import SingleFlight
+from core.sqlite import retry_on_locked
+from core.models import (
+    Barcode,
+    DeliveryCenter,
+    FulfillmentCenter,
+    FulfillmentCenterArticle,
+    Job,
+    QueryShape,
+    SalesChannel,
+    SalesChannelSupplierArticle,
+    Supplier,
+    Warehouse,
+)
+from core.views import create_resource
+
+urlpatterns = [
+    path(
+        "",
+        include(
+            (
+                create_resource("core", Warehouse, ["name"])
+                + create_resource(
+                    "core", FulfillmentCenter, ["name", "warehouse", "delivery_center"]
+                )
+                + create_resource(
+                    "core",
+                    FulfillmentCenterArticle,
+                    ["fulfillment_center", "article_number", "barcodes"],
+                )
+                + create_resource(
+                    "core",
+                    SalesChannelSupplierArticle,
+                    [
+                        "sales_channel",
+                        "supplier",
+                        "article_number",
+                        "price",
+                        "price_old",
+                    ],
+                ),
+                "core",
+            ),
+            namespace="core",
+        ),
+    ),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class ResourceTestCase(TestCase):
+    def setUp(self):
+        # Table versions restart with every test, so cached responses from an
+        # earlier test could match a fresh ETag.
+        caches["responses"].clear()
+
+    def post_json(self, url, body, **extra):
+        return self.client.post(url, body, content_type="application/json", **extra)
+
+
+def create_center(name):
+    return FulfillmentCenter.objects.create(
+        warehouse=Warehouse.objects.create(name=name),
+        delivery_center=DeliveryCenter.objects.create(name=name),
+        name=name,
+    )
+
+
+class MalformedBodyTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.warehouse = Warehouse.objects.create(name="Warehouse")
+
+    def assertBadRequest(self, response):
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("not valid JSON", json.loads(response.content)["error"])
+
+    def test_list_post(self):
+        self.assertBadRequest(self.post_json("/warehouses/", "{bad"))
+
+    def test_object_patch(self):
+        self.assertBadRequest(
+            self.client.patch(
+                "/warehouses/{}/".format(self.warehouse.pk),
+                "{bad",
+                content_type="application/json",
+            )
+        )
+
+    def test_batch_post(self):
+        self.assertBadRequest(self.post_json("/warehouses/batch/", "[1,"))
+
+    def test_invalid_encoding(self):
+        self.assertBadRequest(self.post_json("/warehouses/", b"\xff\xfe"))
+
+
+class ConditionalWriteTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.warehouse = Warehouse.objects.create(name="Warehouse")
+        self.url = "/warehouses/{}/".format(self.warehouse.pk)
+
+    def patch(self, body, content_type="application/json", **extra):
+        return self.client.patch(self.url, body, content_type=content_type, **extra)
+
+    def test_if_match(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.patch(json.dumps({"name": "Renamed"}), HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        response = self.patch(json.dumps({"name": "Stale"}), HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.warehouse.refresh_from_db()
+        self.assertEqual(self.warehouse.name, "Renamed")
+
+    def test_if_match_ignores_representation(self):
+        etag = self.client.get(self.url + "?fields=name", HTTP_ACCEPT_ENCODING="gzip")[
+            "ETag"
+        ]
+        Warehouse.objects.create(name="Other")
+
+        response = self.patch(json.dumps({"name": "Renamed"}), HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_non_object_bodies(self):
+        for body in ["[1, 2]", "5", "null", '"name"']:
+            with self.subTest(body=body):
+                self.assertEqual(self.patch(body).status_code, 400)
+                self.assertEqual(self.post_json(self.url, body).status_code, 400)
+                self.assertEqual(self.post_json("/warehouses/", body).status_code, 400)
+
+    def test_unsupported_content_type(self):
+        response = self.patch(
+            b"--x\r\nContent-Disposition: form-data; name=name\r\n\r\nX\r\n--x--\r\n",
+            content_type="multipart/form-data; boundary=x",
+        )
+        self.assertEqual(response.status_code, 415)
+
+    def test_form_patch(self):
+        response = self.patch(
+            "name=Form", content_type="application/x-www-form-urlencoded"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.warehouse.refresh_from_db()
+        self.assertEqual(self.warehouse.name, "Form")
+
+    def test_unknown_field(self):
+        response = self.patch(json.dumps({"bogus": 1}))
+        self.assertEqual(
+            json.loads(response.content)["error"], {"bogus": ["Unknown field."]}
+        )
+
+
+class ConditionalReadTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.warehouse = Warehouse.objects.create(name="Warehouse")
+        self.url = "/warehouses/{}/".format(self.warehouse.pk)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_response_keeps_row_tag(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        Warehouse.objects.filter(pk=self.warehouse.pk).get().save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_not_modified(self):
+        etag = self.client.get("/warehouses/")["ETag"]
+        response = self.client.get("/warehouses/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Warehouse.objects.create(name="Other")
+        response = self.client.get("/warehouses/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@jobs.task
+def rename_warehouse(pk, name):
+    Warehouse.objects.filter(pk=pk).update(name=name)
+
+
+@jobs.task
+def fail():
+    raise RuntimeError("Failed.")
+
+
+class JobTests(TestCase):
+    def test_run(self):
+        warehouse = Warehouse.objects.create(name="Warehouse")
+        job = jobs.enqueue(rename_warehouse, args=(warehouse.pk, "Renamed"))
+
+        claimed = jobs.claim_next()
+        self.assertEqual(claimed, job)
+        self.assertIsNone(jobs.claim_next())
+        self.assertTrue(jobs.run(claimed))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.claim), (Job.DONE, ""))
+        warehouse.refresh_from_db()
+        self.assertEqual(warehouse.name, "Renamed")
+
+    def test_priority_and_delay(self):
+        low = jobs.enqueue(fail)
+        high = jobs.enqueue(fail, priority=1)
+        jobs.enqueue(fail, priority=2, delay=60)
+
+        self.assertEqual(jobs.claim_next(), high)
+        self.assertEqual(jobs.claim_next(), low)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_retry_then_fail(self):
+        job = jobs.enqueue(fail, max_attempts=2)
+
+        self.assertFalse(jobs.run(jobs.claim_next()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("RuntimeError", job.error)
+
+        Job.objects.filter(pk=job.pk).update(available_at=timezone.now())
+        self.assertFalse(jobs.run(jobs.claim_next()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNone(jobs.claim_next())
+
+    def test_unknown_task(self):
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue("core.tests.missing")
+
+    def test_extended_claims_are_kept(self):
+        job = jobs.enqueue(fail)
+        claimed = jobs.claim_next()
+        expired = timezone.now() - timedelta(seconds=1)
+
+        Job.objects.filter(pk=job.pk).update(available_at=expired)
+        self.assertEqual(jobs.extend(claimed), 1)
+        self.assertIsNone(jobs.claim_next())
+
+        # Once the claim expires for good, only the new claim can finish it.
+        Job.objects.filter(pk=job.pk).update(available_at=expired)
+        reclaimed = jobs.claim_next()
+        self.assertEqual(reclaimed, job)
+        self.assertEqual(jobs.extend(claimed), 0)
+        self.assertEqual(jobs.finish(claimed, status=Job.DONE), 0)
+        self.assertEqual(jobs.finish(reclaimed, status=Job.DONE), 1)
+
+    def test_heartbeat(self):
+        beats = threading.Semaphore(0)
+
+        with jobs.Heartbeat(beats.release, 0.01) as heartbeat:
+            self.assertTrue(beats.acquire(timeout=5))
+            self.assertTrue(beats.acquire(timeout=5))
+        self.assertFalse(heartbeat.is_alive())
+
+
+class QueryShapeTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        shapes.pending.clear()
+
+    def test_recorded_in_memory(self):
+        for name in ("One", "Two"):
+            self.client.get("/warehouses/?name={}&ordering=-name".format(name))
+        self.client.get("/warehouses/")
+        self.assertFalse(QueryShape.objects.exists())
+
+        shapes.flush()
+        shape = QueryShape.objects.get()
+        self.assertEqual(
+            (shape.label, shape.filters, shape.ordering, shape.count),
+            ("core.warehouse", "name__exact", "-name", 2),
+        )
+
+        self.client.get("/warehouses/?name=Other&ordering=-name")
+        shapes.flush()
+        shape.refresh_from_db()
+        self.assertEqual(shape.count, 3)
+
+    def test_needs_index(self):
+        for plan, expected in [
+            (["SCAN core_warehouse"], True),
+            (["SCAN TABLE core_warehouse"], True),
+            (["SCAN core_warehouse USING INDEX core_warehouse_name"], False),
+            (["SCAN TABLE core_warehouse USING COVERING INDEX x"], False),
+            (["SEARCH core_warehouse USING INTEGER PRIMARY KEY (rowid=?)"], False),
+            (["SCAN core_fulfillmentcenter"], False),
+            (
+                ["SEARCH core_warehouse USING INDEX x", "USE TEMP B-TREE FOR ORDER BY"],
+                True,
+            ),
+        ]:
+            with self.subTest(plan=plan):
+                self.assertEqual(needs_index(Warehouse, plan), expected)
+
+
+class FilterTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.centers = [create_center(name) for name in ("Berlin", "Hamburg")]
+
+    def get_names(self, query):
+        response = self.client.get("/fulfillment_centers/?" + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["name"] for row in json.loads(response.content)["data"]]
+
+    def test_paths(self):
+        for query in (
+            "warehouse.name=Hamburg",
+            "warehouse__name=Hamburg",
+            "warehouse.name__iexact=hamburg",
+            "warehouse__name__startswith=Ham",
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.get_names(query), ["Hamburg"])
+
+    def test_ordering(self):
+        for ordering in ("-warehouse.name", "-warehouse__name"):
+            with self.subTest(ordering=ordering):
+                self.assertEqual(
+                    self.get_names("ordering=" + ordering), ["Hamburg", "Berlin"]
+                )
+
+    def test_lookups(self):
+        pks = ",".join(str(center.pk) for center in self.centers)
+        self.assertEqual(self.get_names("id__in=" + pks), ["Berlin", "Hamburg"])
+        self.assertEqual(self.get_names("name__gt=C"), ["Hamburg"])
+        self.assertEqual(
+            self.get_names("warehouse__isnull=false&name=Berlin"), ["Berlin"]
+        )
+
+    def test_filters_follow_related_changes(self):
+        self.assertEqual(self.get_names("warehouse__name=Munich"), [])
+        warehouse = self.centers[0].warehouse
+        warehouse.name = "Munich"
+        warehouse.save()
+        self.assertEqual(self.get_names("warehouse__name=Munich"), ["Berlin"])
+
+    def test_invalid_filters(self):
+        # Lists are not paginated, so limit and page are unknown fields.
+        for query in (
+            "bogus=1",
+            "name__bogus=1",
+            "warehouse__bogus=1",
+            "ordering=bogus",
+            "limit=1",
+            "page=2",
+            "delivery_center__isnull=maybe",
+            "id__in=a,b",
+        ):
+            with self.subTest(query=query):
+                response = self.client.get("/fulfillment_centers/?" + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(json.loads(response.content)["error"])
+
+
+class SearchTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        center = create_center("Berlin")
+        self.articles = [
+            FulfillmentCenterArticle.objects.create(
+                fulfillment_center=center, article_number=article_number
+            )
+            for article_number in ("SHOE-RED-42", "SHOE-BLUE-43", "SOCK-RED-1")
+        ]
+        self.articles[1].barcodes.add(Barcode.objects.create(barcode="4006381333931"))
+
+    def search(self, query):
+        response = self.client.get("/fulfillment_center_articles/search/?" + query)
+        self.assertEqual(response.status_code, 200)
+        return sorted(
+            row["article_number"] for row in json.loads(response.content)["data"]
+        )
+
+    def assertSearches(self):
+        self.assertEqual(self.search("q=RED"), ["SHOE-RED-42", "SOCK-RED-1"])
+        self.assertEqual(self.search("q=E-BLUE"), ["SHOE-BLUE-43"])
+        self.assertEqual(self.search("q=6381333"), ["SHOE-BLUE-43"])
+        self.assertEqual(self.search("q=GREEN"), [])
+        self.assertEqual(len(self.search("q=SHOE&limit=1")), 1)
+
+    def test_fts(self):
+        self.assertTrue(search.has_fts_table("default"))
+        self.assertSearches()
+
+    def test_like_fallback(self):
+        with mock.patch("core.search.has_fts_table", return_value=False):
+            self.assertSearches()
+
+    def test_short_queries(self):
+        self.assertEqual(self.search("q=1"), ["SHOE-BLUE-43", "SOCK-RED-1"])
+        self.assertEqual(
+            self.search("q="), sorted(a.article_number for a in self.articles)
+        )
+
+    def test_follows_changes(self):
+        self.assertEqual(self.search("q=GREEN"), [])
+        self.articles[0].article_number = "SHOE-GREEN-42"
+        self.articles[0].save()
+        self.assertEqual(self.search("q=GREEN"), ["SHOE-GREEN-42"])
+
+    def test_invalid_limits(self):
+        for limit in ("-1", "x", "1000"):
+            with self.subTest(limit=limit):
+                self.assertLessEqual(len(self.search("q=SHOE&limit=" + limit)), 2)
+        self.assertEqual(self.search("q=SHOE&limit=-1"), [])
+
+    def test_quotes(self):
+        self.assertEqual(self.search('q="RED'), [])
+
+
+class ProjectionTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.center = create_center("Berlin")
+
+    def get_data(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)["data"]
+
+    def test_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_data("/fulfillment_centers/?fields=name")
+
+        self.assertEqual(data, [{"name": "Berlin"}])
+        self.assertNotIn("warehouse_id", queries.captured_queries[-1]["sql"])
+
+    def test_related_fields_are_joined(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_data("/fulfillment_centers/?fields=warehouse.name")
+        create_center("Hamburg")
+
+        with self.assertNumQueries(len(queries)):
+            data = self.get_data("/fulfillment_centers/?fields=warehouse.name")
+        self.assertEqual(
+            data,
+            [{"warehouse": {"name": "Berlin"}}, {"warehouse": {"name": "Hamburg"}}],
+        )
+
+    def test_many_to_many_fields_are_prefetched(self):
+        for article_number in ("A1", "A2", "A3"):
+            article = FulfillmentCenterArticle.objects.create(
+                fulfillment_center=self.center, article_number=article_number
+            )
+            article.barcodes.add(Barcode.objects.create(barcode=article_number + "0"))
+
+        with self.assertNumQueries(3):
+            data = self.get_data(
+                "/fulfillment_center_articles/?fields=barcodes.barcode"
+            )
+        self.assertEqual(
+            data,
+            [
+                {"barcodes": [{"barcode": number + "0"}]}
+                for number in ("A1", "A2", "A3")
+            ],
+        )
+
+    def test_detail(self):
+        data = self.get_data(
+            "/fulfillment_centers/{}/?fields=name&fields=warehouse.name".format(
+                self.center.pk
+            )
+        )
+        self.assertEqual(data, {"name": "Berlin", "warehouse": {"name": "Berlin"}})
+
+    def test_unknown_fields(self):
+        for fields in ("bogus", "warehouse.bogus", "name.length"):
+            with self.subTest(fields=fields):
+                response = self.client.get("/fulfillment_centers/?fields=" + fields)
+                self.assertEqual(response.status_code, 400)
+
+
+class ResponseCacheTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.center = create_center("Berlin")
+
+    def get_hits(self):
+        return metrics.snapshot().get("response_cache.hits", 0)
+
+    def get(self, url):
+        response = self.client.get(url)
+        return response.status_code, json.loads(response.content)["data"]
+
+    def test_hit(self):
+        first = self.get("/fulfillment_centers/?fields=name")
+        hits = self.get_hits()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get("/fulfillment_centers/?fields=name"), first)
+        self.assertEqual(self.get_hits(), hits + 1)
+
+    def test_invalidated_by_writes(self):
+        self.get("/fulfillment_centers/?fields=name")
+        self.center.name = "Munich"
+        self.center.save()
+
+        self.assertEqual(
+            self.get("/fulfillment_centers/?fields=name"), (200, [{"name": "Munich"}])
+        )
+
+    def test_invalidated_by_related_writes(self):
+        url = "/fulfillment_centers/{}/?fields=warehouse.name".format(self.center.pk)
+        self.get(url)
+        warehouse = self.center.warehouse
+        warehouse.name = "Munich"
+        warehouse.save()
+
+        self.assertEqual(self.get(url), (200, {"warehouse": {"name": "Munich"}}))
+
+    def test_errors_are_not_cached(self):
+        hits = self.get_hits()
+
+        for _ in range(2):
+            response = self.client.get("/fulfillment_centers/?bogus=1")
+            self.assertEqual(response.status_code, 400)
+            response = self.client.get("/fulfillment_centers/0/")
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.get_hits(), hits)
+
+
+class CountingLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquired = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.acquired += 1
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+
+class SingleFlightTests(TestCase):
+    def run_concurrently(self, func, callers=4):
+        single_flight = SingleFlight()
+        single_flight.lock = CountingLock()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(func)
+            release.wait(5)
+            return func()
+
+        def call():
+            try:
+                return single_flight.do("key", compute)
+            except RuntimeError as e:
+                return e, True
+
+        with ThreadPoolExecutor(max_workers=callers) as executor:
+            futures = [executor.submit(call) for _ in range(callers)]
+            # Every caller has looked up the key once it has held the lock.
+            while single_flight.lock.acquired < callers:
+                time.sleep(0.001)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.calls, {})
+        return results
+
+    def test_shares_one_computation(self):
+        results = self.run_concurrently(lambda: "result")
+
+        self.assertEqual({value for value, _ in results}, {"result"})
+        self.assertEqual(
+            sorted(shared for _, shared in results), [False, True, True, True]
+        )
+
+    def test_shares_errors(self):
+        error = RuntimeError("Failed.")
+
+        def fail():
+            raise error
+
+        results = self.run_concurrently(fail)
+        self.assertTrue(all(value is error for value, _ in results))
+
+    def test_separate_keys(self):
+        single_flight = SingleFlight()
+        self.assertEqual(single_flight.do("a", lambda: 1), (1, False))
+        self.assertEqual(single_flight.do("b", lambda: 2), (2, False))
+        self.assertEqual(single_flight.do("a", lambda: 3), (3, False))
+
+
+class FakeApp:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.scopes = []
+
+    async def __call__(self, scope, receive, send):
+        self.scopes.append(scope)
+        status, headers = self.responses.pop(0)
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": b""})
+
+
+@override_settings(LONG_POLL_INTERVAL=0.001)
+class LongPollTests(TestCase):
+    not_modified = (304, [(VERSIONS_HEADER.encode(), b"core.warehouse=1")])
+    ok = (200, [])
+
+    def call(self, app, method="GET", query=b"wait=5", disconnect=False):
+        sent = []
+        messages = [{"type": "http.request", "body": b""}]
+        if disconnect:
+            messages.append({"type": "http.disconnect"})
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(10)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "query_string": query, "headers": []}
+        asyncio.run(LongPollMiddleware(app)(scope, receive, send))
+        return [message["status"] for message in sent if "status" in message], sent
+
+    def test_waits_for_a_new_version(self):
+        app = FakeApp(self.not_modified, self.ok)
+
+        with mock.patch(
+            "core.asgi.get_versions", side_effect=[[("core.warehouse", 1)]] * 3 + [[]]
+        ) as get_versions:
+            statuses, _ = self.call(app, query=b"wait=5&name=x")
+
+        self.assertEqual(statuses, [200])
+        self.assertEqual(get_versions.call_count, 4)
+        self.assertEqual(app.scopes[0]["query_string"], b"name=x")
+        self.assertIn((b"x-long-poll", b"1"), app.scopes[0]["headers"])
+
+    def test_gives_up_at_the_deadline(self):
+        app = FakeApp(self.not_modified)
+
+        with mock.patch("core.asgi.get_versions", return_value=[("core.warehouse", 1)]):
+            statuses, sent = self.call(app, query=b"wait=0.01")
+
+        self.assertEqual(statuses, [304])
+        self.assertEqual(sent[0]["headers"], [])
+
+    def test_stops_on_disconnect(self):
+        app = FakeApp(self.not_modified)
+
+        with mock.patch("core.asgi.get_versions", return_value=[("core.warehouse", 1)]):
+            statuses, _ = self.call(app, disconnect=True)
+
+        self.assertEqual(statuses, [])
+
+    def test_passes_other_requests_through(self):
+        for method, query in (("GET", b""), ("POST", b"wait=5"), ("GET", b"wait=x")):
+            with self.subTest(method=method, query=query):
+                app = FakeApp(self.not_modified)
+                self.assertEqual(self.call(app, method, query)[0], [304])
+                self.assertEqual(len(app.scopes), 1)
+
+
+class LongPollViewTests(ResourceTestCase):
+    def test_not_modified_reports_versions(self):
+        Warehouse.objects.create(name="Warehouse")
+        etag = self.client.get("/warehouses/")["ETag"]
+
+        response = self.client.get(
+            "/warehouses/", HTTP_IF_NONE_MATCH=etag, HTTP_X_LONG_POLL="1"
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertRegex(response[VERSIONS_HEADER], r"^core\.warehouse=\d+$")
+
+        response = self.client.get("/warehouses/", HTTP_IF_NONE_MATCH=etag)
+        self.assertFalse(response.has_header(VERSIONS_HEADER))
+
+
+class EncoderTests(ResourceTestCase):
+    columnar = encoders.ColumnarJSONEncoder.content_type
+
+    def test_negotiation(self):
+        for accept, content_type in [
+            ("", "application/json"),
+            ("*/*", "application/json"),
+            ("text/html", "application/json"),
+            (self.columnar, self.columnar),
+            ("application/json;q=0.5, {}".format(self.columnar), self.columnar),
+            ("application/json, {};q=0.5".format(self.columnar), "application/json"),
+            ("{};q=0, text/html".format(self.columnar), "application/json"),
+            ("{};q=x".format(self.columnar), "application/json"),
+        ]:
+            with self.subTest(accept=accept):
+                self.assertEqual(
+                    encoders.get_encoder(accept).content_type, content_type
+                )
+
+    def test_json(self):
+        data = {
+            "price": Decimal("1.50"),
+            "created": datetime(2020, 1, 2, 3, 4, 5),
+            "names": ("a", "b"),
+        }
+        expected = {
+            "price": "1.50",
+            "created": "2020-01-02T03:04:05",
+            "names": ["a", "b"],
+        }
+
+        self.assertEqual(json.loads(encoders.JSONEncoder().encode(data)), expected)
+        with mock.patch("core.encoders.orjson", None):
+            self.assertEqual(json.loads(encoders.JSONEncoder().encode(data)), expected)
+
+    def test_columnar_response(self):
+        Warehouse.objects.create(name="One")
+        Warehouse.objects.create(name="Two")
+
+        response = self.client.get("/warehouses/", HTTP_ACCEPT=self.columnar)
+
+        self.assertEqual(response["Content-Type"], self.columnar)
+        self.assertEqual(
+            json.loads(response.content)["data"],
+            {"columns": ["name"], "values": [["One", "Two"]]},
+        )
+        self.assertIn("Accept", response["Vary"])
+        self.assertNotEqual(response["ETag"], self.client.get("/warehouses/")["ETag"])
+
+    @skipIf(encoders.msgpack is None, "msgpack is not installed")
+    def test_msgpack_response(self):
+        Warehouse.objects.create(name="One")
+
+        response = self.client.get("/warehouses/", HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            encoders.msgpack.unpackb(response.content),
+            {"data": [{"name": "One"}], "error": None},
+        )
+
+
+class CompressionTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        Warehouse.objects.bulk_create(
+            Warehouse(name="Warehouse {}".format(number)) for number in range(100)
+        )
+
+    def get(self, accept_encoding, url="/warehouses/", **extra):
+        return self.client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding, **extra)
+
+    def test_gzip(self):
+        plain = self.get("")
+        response = self.get("gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            zlib.decompress(response.content, 16 + zlib.MAX_WBITS), plain.content
+        )
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["ETag"], "W/" + plain["ETag"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_negotiation(self):
+        for accept_encoding, coding in [
+            ("deflate", "deflate"),
+            ("gzip;q=0.5, deflate", "deflate"),
+            ("gzip;q=0, *", "deflate"),
+            ("br", None),
+            ("*;q=0", None),
+            ("gzip;q=x", None),
+            ("", None),
+        ]:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.get(accept_encoding)
+                self.assertEqual(response.get("Content-Encoding"), coding)
+                json.loads(
+                    zlib.decompress(response.content)
+                    if coding == "deflate"
+                    else response.content
+                )
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.get("gzip", "/warehouses/?name=Warehouse 1")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_weak_etag_matches(self):
+        etag = self.get("gzip")["ETag"]
+        self.assertEqual(self.get("gzip", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get("", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class BatchTests(ResourceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.warehouses = [Warehouse.objects.create(name=name) for name in ("A", "B")]
+        self.pks = [warehouse.pk for warehouse in self.warehouses]
+
+    def assertBatch(self, response, found, not_found=()):
+        self.assertEqual(response.status_code, 200, response.content)
+        content = json.loads(response.content)
+        self.assertEqual(
+            content["data"],
+            {
+                **{str(pk): {"name": name} for pk, name in found},
+                **{str(pk): None for pk in not_found},
+            },
+        )
+        self.assertEqual(content["not_found"], list(not_found))
+
+    def test_get(self):
+        a, b = self.pks
+        response = self.client.get(
+            "/warehouses/batch/?ids={},0&ids={},{}".format(b, a, b)
+        )
+        self.assertBatch(response, [(b, "B"), (a, "A")], not_found=[0])
+        self.assertEqual(
+            list(json.loads(response.content)["data"]), [str(b), "0", str(a)]
+        )
+
+    def test_post(self):
+        a, b = self.pks
+        found = [(a, "A"), (b, "B")]
+
+        self.assertBatch(
+            self.post_json("/warehouses/batch/", json.dumps([a, b])), found
+        )
+        self.assertBatch(
+            self.post_json("/warehouses/batch/", json.dumps({"ids": [str(a), b]})),
+            found,
+        )
+        self.assertBatch(
+            self.client.post("/warehouses/batch/", {"ids": "{},{}".format(a, b)}), found
+        )
+
+    def test_constant_queries(self):
+        with self.assertNumQueries(2):
+            self.client.get("/warehouses/batch/?ids=" + ",".join(map(str, self.pks)))
+
+    def test_invalid_ids(self):
+        for body in (["x"], [1.5], [True], [None], {"ids": "1,2"}, 1, "ids", [[1]]):
+            with self.subTest(body=body):
+                response = self.post_json("/warehouses/batch/", json.dumps(body))
+                self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.client.get("/warehouses/batch/?ids=1,x").status_code, 400)
+
+    def test_too_many_ids(self):
+        response = self.post_json("/warehouses/batch/", json.dumps(list(range(1001))))
+        self.assertEqual(response.status_code, 400)
+
+
+class AggregateTests(ResourceTestCase):
+    url = "/sales_channel_supplier_articles/aggregate/"
+
+    def setUp(self):
+        super().setUp()
+        sales_channel = SalesChannel.objects.create(name="Shop")
+        self.suppliers = [Supplier.objects.create(name=name) for name in ("A", "B")]
+        for supplier, article_number, price in [
+            (self.suppliers[0], "1", "1.00"),
+            (self.suppliers[0], "2", "3.00"),
+            (self.suppliers[1], "3", "5.50"),
+        ]:
+            SalesChannelSupplierArticle.objects.create(
+                sales_channel=sales_channel,
+                supplier=supplier,
+                article_number=article_number,
+                price=Decimal(price),
+                price_old=Decimal(price),
+            )
+
+    def aggregate(self, query):
+        response = self.client.get(self.url + "?" + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content)["data"]
+
+    def assertRows(self, rows, expected):
+        # SQLite returns decimal aggregates without the field's scale.
+        self.assertEqual(
+            [
+                {
+                    name: Decimal(value) if name.startswith("price__") else value
+                    for name, value in row.items()
+                }
+                for row in rows
+            ],
+            expected,
+        )
+
+    def test_totals(self):
+        self.assertRows(
+            self.aggregate("count=*&min=price&max=article_number"),
+            [{"count": 3, "price__min": Decimal("1"), "article_number__max": "3"}],
+        )
+
+    def test_group_by(self):
+        a, b = (supplier.pk for supplier in self.suppliers)
+        self.assertRows(
+            self.aggregate("group_by=supplier&count=*&sum=price"),
+            [
+                {"supplier": a, "count": 2, "price__sum": Decimal("4")},
+                {"supplier": b, "count": 1, "price__sum": Decimal("5.5")},
+            ],
+        )
+
+    def test_filters(self):
+        self.assertRows(
+            self.aggregate("supplier={}&avg=price".format(self.suppliers[0].pk)),
+            [{"price__avg": Decimal("2")}],
+        )
+        self.assertRows(
+            self.aggregate("supplier__name=B&group_by=supplier&count=*"),
+            [{"supplier": self.suppliers[1].pk, "count": 1}],
+        )
+
+    def test_invalid(self):
+        for query in (
+            "",
+            "group_by=supplier",
+            "sum=article_number",
+            "avg=supplier",
+            "count=bogus",
+            "group_by=supplier.name&count=*",
+            "median=price",
+            "count=*&bogus=1",
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(self.url + "?" + query)
+                self.assertEqual(response.status_code, 400)
+
+        response = self.client.get("/warehouses/aggregate/?count=id")
+        self.assertEqual(response.status_code, 400)
+
+
+class SQLiteTests(TestCase):
+    def test_pragmas(self):
+        with connection.cursor() as cursor:
+            for pragma, value in [
+                ("journal_mode", "wal"),
+                ("synchronous", 1),
+                ("temp_store", 2),
+                ("cache_size", -65536),
+            ]:
+                with self.subTest(pragma=pragma):
+                    cursor.execute("PRAGMA {}".format(pragma))
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+
+@override_settings(SQLITE_LOCK_RETRIES=3, SQLITE_LOCK_RETRY_DELAY=0)
+class RetryOnLockedTests(SimpleTestCase):
+    def call(self, *errors):
+        errors = list(errors)
+
+        @retry_on_locked
+        def func():
+            if errors:
+                raise errors.pop(0)
+            return "done"
+
+        return func()
+
+    def test_retries_locked_errors(self):
+        retries = metrics.snapshot().get("sqlite.lock_retries", 0)
+
+        self.assertEqual(
+            self.call(
+                OperationalError("database is locked"),
+                OperationalError("database is busy"),
+            ),
+            "done",
+        )
+        self.assertEqual(metrics.snapshot()["sqlite.lock_retries"], retries + 2)
+
+    def test_gives_up(self):
+        with self.assertRaises(OperationalError):
+            self.call(*[OperationalError("database is locked")] * 3)
+
+    def test_other_errors(self):
+        with self.assertRaisesMessage(OperationalError, "no such table"):
+            self.call(OperationalError("no such table: x"))
+
+    def test_not_inside_transactions(self):
+        with mock.patch.object(connection, "in_atomic_block", True):
+            with self.assertRaises(OperationalError):
+                self.call(OperationalError("database is locked"))
+
+
+class ReplicaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "replica.sqlite3")
+
+        replica = override_settings(REPLICA_PATH=self.path, REPLICA_MAX_STALENESS=30)
+        replica.enable()
+        self.addCleanup(replica.disable)
+
+        databases = mock.patch.dict(settings.DATABASES, replica={})
+        databases.start()
+        self.addCleanup(databases.stop)
+
+    def touch(self, age=0):
+        open(self.path, "a").close()
+        os.utime(self.path, (time.time() - age, time.time() - age))
+
+    def test_is_replica_fresh(self):
+        self.assertFalse(routers.is_replica_fresh())
+
+        self.touch()
+        self.assertTrue(routers.is_replica_fresh())
+
+        self.touch(age=60)
+        self.assertFalse(routers.is_replica_fresh())
+
+        self.touch()
+        del settings.DATABASES["replica"]
+        self.assertFalse(routers.is_replica_fresh())
+
+    def test_router(self):
+        router = routers.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Warehouse))
+
+        token = routers.use_replica.set(True)
+        self.addCleanup(routers.use_replica.reset, token)
+        self.assertEqual(router.db_for_read(Warehouse), "replica")
+
+        warehouse = Warehouse(name="One")
+        self.assertIsNone(router.db_for_write(Warehouse, instance=warehouse))
+        warehouse._state.db = "replica"
+        self.assertEqual(router.db_for_write(Warehouse, instance=warehouse), "default")
+        self.assertFalse(router.allow_migrate("replica", "core"))
+        self.assertIsNone(router.allow_migrate("default", "core"))
+
+    def test_middleware(self):
+        self.touch()
+        seen = []
+
+        def get_response(request):
+            seen.append(routers.use_replica.get())
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        factory = RequestFactory()
+        middleware(factory.get("/warehouses/"))
+        middleware(factory.post("/warehouses/"))
+        self.touch(age=60)
+        middleware(factory.get("/warehouses/"))
+
+        self.assertEqual(seen, [True, False, False])
+        self.assertFalse(routers.use_replica.get())
+
+    def test_refresh_without_replica(self):
+        with override_settings(REPLICA_PATH=None):
+            with self.assertRaisesMessage(CommandError, "DATABASE_REPLICA is not set."):
+                call_command("refreshreplica", "--once")
+
+
+# The backup API cannot copy from a connection in the middle of writing, so the
+# refresh runs outside a test transaction like the command itself.
+class RefreshReplicaTests(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "replica.sqlite3")
+
+    def test_refresh(self):
+        Warehouse.objects.create(name="One")
+        started = time.time()
+
+        with override_settings(REPLICA_PATH=self.path):
+            call_command("refreshreplica", "--once", stdout=io.StringIO())
+
+        replica = sqlite3.connect(self.path)
+        self.addCleanup(replica.close)
+        self.assertEqual(
+            replica.execute("SELECT name FROM core_warehouse").fetchall(), [("One",)]
+        )
+        self.assertGreaterEqual(os.stat(self.path).st_mtime, int(started))
@@ -0,0 +1,106 @@
+import hashlib
+from typing import Iterable, Type
+
+from django.db import models
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+from core.models import (
+    ChangeEvent,
+    IdempotencyKey,
+    Job,
+    QueryShape,
+    ReplicationState,
+    TableVersion,
+)
+
+IGNORED_LABELS = (
+    ChangeEvent._meta.label_lower,
+    IdempotencyKey._meta.label_lower,
+    Job._meta.label_lower,
+    QueryShape._meta.label_lower,
+    ReplicationState._meta.label_lower,
+    TableVersion._meta.label_lower,
+)
+
+
+def is_tracked(model: Type[models.Model]):
+    app_config = model._meta.app_config
+
+    return (
+        app_config is not None
+        and not app_config.name.startswith("django.")
+        and model._meta.label_lower not in IGNORED_LABELS
+    )
+
+
+def bump_version(model: Type[models.Model]):
+    if not is_tracked(model):
+        return
+
+    label = model._meta.label_lower
+
+    queryset = TableVersion.objects.filter(label=label)
+    if not queryset.update(version=F("version") + 1, modified=timezone.now()):
+        TableVersion.objects.get_or_create(label=label)
+        queryset.update(version=F("version") + 1, modified=timezone.now())
+
+
+def get_validators(key: str, dependencies: Iterable[Type[models.Model]]):
+    versions = sorted(
+        TableVersion.objects.filter(
+            label__in=[model._meta.label_lower for model in dependencies]
+        ).values_list("label", "version", "modified")
+    )
+
+    digest = hashlib.md5(
+        repr((key, [(label, version) for label, version, _ in versions])).encode()
+    )
+    etag = '"{}"'.format(digest.hexdigest())
+    last_modified = max((modified for _, _, modified in versions), default=None)
+
+    return etag, last_modified
+
+
+def get_row_version(model: Type[models.Model], pk, m2m_fields=()):
+    queryset = model._default_manager.filter(pk=pk)
+
+    row = queryset.values_list(
+        *[field.attname for field in model._meta.concrete_fields]
+    ).first()
+    if row is None:
+        return None
+
+    related = [
+        sorted(
+            queryset.filter(**{name + "__isnull": False}).values_list(name, flat=True)
+        )
+        for name in m2m_fields
+    ]
+
+    return hashlib.md5(repr((row, related)).encode()).hexdigest()[:16]
+
+
+def get_versions(labels):
+    versions = dict(
+        TableVersion.objects.filter(label__in=labels).values_list("label", "version")
+    )
+    return sorted((label, versions.get(label, 0)) for label in labels)
+
+
+def update_version(sender, **kwargs):
+    bump_version(sender)
+
+
+def update_m2m_versions(sender, instance, model, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_version(sender)
+        bump_version(type(instance))
+        bump_version(model)
+
+
+def connect_signals():
+    post_save.connect(update_version)
+    post_delete.connect(update_version)
+    m2m_changed.connect(update_m2m_versions)
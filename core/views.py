@@ -1,160 +1,476 @@
+from functools import lru_cache
 from typing import Type
+from urllib.parse import urlencode
 
 from django import forms
-from django.http.response import JsonResponse
-from django.db import models
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.cache import caches
+from django.forms.models import modelform_factory
+from django.http.request import QueryDict
+from django.http.response import HttpResponse
+from django.db import models, transaction
+from django.views.generic.base import View
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView
 from django.views.generic.list import ListView
 from django.urls import reverse_lazy, path
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+from core import encoders, idempotency, metrics, search, shapes, versions
+from core.asgi import VERSIONS_HEADER
+from core.encoders import EncodedResponse
+from core.filters import (
+    AGGREGATES,
+    GROUP_BY_PARAMETER,
+    HIDDEN_FIELDS,
+    LIST_SEPARATOR,
+    ORDERING_PARAMETER,
+    FilterError,
+    apply_projection,
+    get_accessor_name,
+    get_aggregation_plan,
+    get_dependencies,
+    get_fields,
+    get_prefetch,
+    get_query_plan,
+    is_single_valued,
+)
+from core.middleware import MalformedBody, read_body
+from core.singleflight import SingleFlight
+from core.sqlite import retry_on_locked
+
+
+def get_queryset_operations(model, request_data, fields=None):
+    query_plan = get_query_plan(model, request_data, fields=fields)
+    shapes.record(model, query_plan)
 
+    queryset_operations = {
+        "select_related": list(query_plan.select_related),
+        "prefetch_related": [
+            get_prefetch(prefetch_plan) for prefetch_plan in query_plan.prefetch_related
+        ],
+        "only": list(query_plan.only),
+        "filter": [
+            models.Q(
+                **{condition.lookup: condition.convert(request_data[condition.key])}
+            )
+            for condition in query_plan.filters
+        ],
+        "order_by": list(query_plan.order_by),
+        "values": list(query_plan.values),
+    }
 
-def swallow(exceptions, default, func, *args, **kwargs):
-    try:
-        return func(*args, **kwargs)
-    except Exception as e:
-        if type(e) in exceptions:
-            return default
-        raise e
-
-
-def get_fields(model: Type[models.Model]):
-    return {field.name: field for field in model._meta.get_fields()}
-
-
-def is_chain_of_foreign_objects(model: Type[models.Model], split_key: list):
-    fields = get_fields(model)
-
-    for split_key_part in split_key:
-        field = fields[split_key_part]
-        if not any((field.one_to_many, field.one_to_one)):
-            break
-        model = fields[split_key_part].related_model
-        fields = get_fields(model)
-    else:
-        return True
-
-    return False
+    return queryset_operations
 
 
-def get_queryset_operations(model, request_data):
-    queryset_operations = {
-        "select_related": [],
-        "prefetch_related": [],
-        "filter": [],
-        "values": [],
-    }
+PATCH_CONTENT_TYPES = ("application/json", "application/x-www-form-urlencoded")
 
-    for key in request_data:
-        split_key = key.split(".")
-        value = request_data[key]
+OWN = "own"
+SINGLE = "single"
+MANY = "many"
 
-        for depth in range(len(split_key)):
-            pred_paths = split_key[: depth + 1]
 
-            if is_chain_of_foreign_objects(model, pred_paths):
-                queryset_operations["select_related"].append("__".join(pred_paths))
+@lru_cache(maxsize=1024)
+def get_serialized_fields(model: Type[models.Model], show_fields: tuple):
+    serialized_fields = {OWN: [], SINGLE: [], MANY: []}
 
-        # TODO: Implement prefetch_related
+    for field in model._meta.get_fields():
+        if field.name in HIDDEN_FIELDS:
+            continue
 
-        queryset_operations["filter"].append(
-            models.Q(**{key.replace(".", "__"): value})
+        nested_fields = tuple(
+            show_field.split(".", 1)[-1]
+            for show_field in show_fields
+            if show_field.startswith(field.name + ".")
+        )
+        if field.name not in show_fields and not nested_fields:
+            continue
+
+        if not field.is_relation:
+            kind = OWN
+        elif is_single_valued(field):
+            kind = SINGLE
+        else:
+            kind = MANY
+
+        serialized_fields[kind].append(
+            (field.name, get_accessor_name(field), nested_fields)
         )
 
-        # TODO: Implement values
+    return serialized_fields
 
-    return queryset_operations
+
+def get_related_object(model_instance, accessor_name):
+    try:
+        return getattr(model_instance, accessor_name)
+    except ObjectDoesNotExist:
+        return None
 
 
 def serialize_model_instance(model_instance, show_fields=None):
     if model_instance is None:
         return None
 
-    if show_fields is None:
-        show_fields = []
-
-    model = type(model_instance)
-    fields = [
-        field
-        for field in model._meta.get_fields()
-        if any(
-            [
-                ((show_field == field.name) or show_field.startswith(field.name + "."))
-                for show_field in show_fields
-            ]
-        )
-        and field.name != "password"
-    ]
-    own_fields = [
-        field for field in fields if getattr(field, "related_model", None) is None
-    ]
-    direct_fields = [
-        field
-        for field in fields
-        if any((field.one_to_many, field.one_to_one))
-        and not getattr(field, "multiple", False)
-    ]
-    many_fields = [
-        field for field in fields if any((field.many_to_many, field.many_to_one))
-    ]
+    serialized_fields = get_serialized_fields(
+        type(model_instance), tuple(show_fields or ())
+    )
 
     serialized_model_instance = {
-        field.name: getattr(model_instance, field.name) for field in own_fields
+        name: getattr(model_instance, accessor_name)
+        for name, accessor_name, _ in serialized_fields[OWN]
     }
 
     serialized_model_instance.update(
         {
-            field.name: serialize_model_instance(
-                model_instance=swallow(
-                    [
-                        getattr(
-                            model, getattr(field, "related_name", field.name)
-                        ).RelatedObjectDoesNotExist
-                    ],
-                    None,
-                    getattr,
-                    model_instance,
-                    getattr(field, "related_name", field.name),
-                ),
-                show_fields=[
-                    show_field.split(".", 1)[-1]
-                    for show_field in show_fields
-                    if show_field.startswith(
-                        getattr(field, "related_name", field.name) + "."
-                    )
-                ],
+            name: serialize_model_instance(
+                model_instance=get_related_object(model_instance, accessor_name),
+                show_fields=nested_fields,
             )
-            for field in direct_fields
+            for name, accessor_name, nested_fields in serialized_fields[SINGLE]
         }
     )
 
     serialized_model_instance.update(
         {
-            field.name: [
+            name: [
                 serialize_model_instance(
-                    model_instance=foreign_object,
-                    show_fields=[
-                        show_field.split(".", 1)[-1]
-                        for show_field in show_fields
-                        if show_field.startswith(field.name + ".")
-                    ],
+                    model_instance=foreign_object, show_fields=nested_fields
                 )
-                for foreign_object in getattr(model_instance, field.name).all()
+                for foreign_object in getattr(model_instance, accessor_name).all()
             ]
-            for field in many_fields
+            for name, accessor_name, nested_fields in serialized_fields[MANY]
         }
     )
 
     return serialized_model_instance
 
 
-class RESTFulObjectView(UpdateView, DetailView):
-    response_class = JsonResponse
+def get_request_key(request, content_type):
+    return "{} {}?{}".format(
+        content_type, request.path, urlencode(sorted(request.GET.lists()), doseq=True)
+    )
+
+
+class RESTFulMixin:
+    response_class = EncodedResponse
+    compression_level: int = None
+    compression_min_length: int = None
+    max_body_size: int = None
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+
+        if self.compression_level is not None:
+            request.compression_level = self.compression_level
+        if self.compression_min_length is not None:
+            request.compression_min_length = self.compression_min_length
+
+    def dispatch(self, request, *args, **kwargs):
+        # JSON bodies are parsed lazily, whenever a view first reads
+        # request.POST, so a malformed body is answered here for all of them.
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except MalformedBody as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
+    def get_encoder(self):
+        return encoders.get_encoder(self.request.META.get("HTTP_ACCEPT", ""))
+
+    def render_data(self, data, **response_kwargs):
+        return self.response_class(data, encoder=self.get_encoder(), **response_kwargs)
+
+
+class IdempotentPostMixin:
+    # Wrapping dispatch rather than post keeps the views' own post handlers
+    # covered.
+    def dispatch(self, request, *args, **kwargs):
+        key = request.META.get("HTTP_IDEMPOTENCY_KEY")
+        if request.method != "POST" or not key:
+            return super().dispatch(request, *args, **kwargs)
+
+        fingerprint = idempotency.get_fingerprint(request, read_body(request))
+        record, response = self.idempotent_post(
+            key, fingerprint, request, *args, **kwargs
+        )
+
+        if record is None:
+            return response
+
+        if record.fingerprint != fingerprint:
+            return self.render_data(
+                {
+                    "data": None,
+                    "error": "Idempotency-Key was used for a different request.",
+                },
+                status=422,
+            )
+
+        if record.status is None:
+            return self.render_data(
+                {
+                    "data": None,
+                    "error": "A request with this Idempotency-Key is in progress.",
+                },
+                status=409,
+            )
+
+        metrics.increment("idempotency.replays")
+        return idempotency.replay(record)
+
+    # The key, the view's writes and the stored response commit together, so a
+    # crash leaves no half-claimed key and a recorded key always means the
+    # write happened.
+    @retry_on_locked
+    def idempotent_post(self, key, fingerprint, request, *args, **kwargs):
+        with transaction.atomic():
+            record = idempotency.claim(key, request.path, fingerprint)
+            if record is not None:
+                return record, None
+
+            response = super().dispatch(request, *args, **kwargs)
+
+            # A response that cannot be replayed is rolled back along with the
+            # key, so a retry runs the request again instead of twice.
+            if response.status_code >= 500 or response.streaming:
+                transaction.set_rollback(True)
+            else:
+                idempotency.store(key, request.path, response)
+
+        return None, response
+
+
+in_flight = SingleFlight()
+
+
+def map_etags(header, func):
+    return ", ".join(
+        etag if etag == "*" else func(etag)
+        for etag in parse_etags(header.replace("W/", ""))
+    )
+
+
+class ConditionalRequestMixin(RESTFulMixin):
+    cache_alias = "responses"
+
+    def get_dependencies(self):
+        paths = list(self.request.GET.getlist("fields") or self.fields or [])
+        paths.extend(self.request.GET.keys())
+        paths.extend(self.request.GET.get(ORDERING_PARAMETER, "").split(","))
+
+        return get_dependencies(self.model, tuple(path for path in paths if path))
+
+    def get_validators(self, request):
+        etag, last_modified = versions.get_validators(
+            get_request_key(request, self.get_encoder().content_type),
+            self.get_dependencies(),
+        )
+        return etag, last_modified and int(last_modified.timestamp())
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return self.dispatch_get(request, *args, **kwargs)
+
+        if (
+            "HTTP_IF_MATCH" in request.META
+            or "HTTP_IF_UNMODIFIED_SINCE" in request.META
+        ):
+            return self.dispatch_conditional_write(request, *args, **kwargs)
+
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_write_validators(self, request):
+        return self.get_validators(request)
+
+    def get_response_tag(self, etag):
+        return etag
+
+    def get_read_tag(self, etag):
+        return etag
+
+    def get_write_tag(self, etag):
+        return etag
+
+    def dispatch_conditional_write(self, request, *args, **kwargs):
+        # CompressionMiddleware weakens the ETags it sends, but the tag still
+        # identifies the uncompressed representation, so compare it as strong.
+        if "HTTP_IF_MATCH" in request.META:
+            request.META["HTTP_IF_MATCH"] = map_etags(
+                request.META["HTTP_IF_MATCH"], self.get_write_tag
+            )
+
+        response = self.conditional_write(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            etag, _ = self.get_validators(request)
+            response["ETag"] = self.get_response_tag(etag)
+
+        return response
+
+    @retry_on_locked
+    def conditional_write(self, request, *args, **kwargs):
+        with transaction.atomic():
+            etag, last_modified = self.get_write_validators(request)
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                return response
+
+            return super().dispatch(request, *args, **kwargs)
+
+    def dispatch_get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        if "HTTP_IF_NONE_MATCH" in request.META:
+            request.META["HTTP_IF_NONE_MATCH"] = map_etags(
+                request.META["HTTP_IF_NONE_MATCH"], self.get_read_tag
+            )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            if response.status_code == 304 and "HTTP_X_LONG_POLL" in request.META:
+                response[VERSIONS_HEADER] = ",".join(
+                    "{}={}".format(label, version)
+                    for label, version in versions.get_versions(
+                        [model._meta.label_lower for model in self.get_dependencies()]
+                    )
+                )
+            return response
+
+        response = self.get_cached_response(etag)
+        if response is None:
+            response = self.get_coalesced_response(
+                etag, lambda: self.render_get(etag, request, *args, **kwargs)
+            )
+            self.cache_response(etag, response)
+
+        patch_vary_headers(response, ("Accept",))
+
+        if response.status_code == 200 and last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+
+        return response
+
+    # The response tag is computed only when a response is rendered and is
+    # cached with it, so 304s and cache hits cost no more than the validators.
+    def render_get(self, etag, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            response["ETag"] = self.get_response_tag(etag)
+
+        return response
+
+    def get_coalesced_response(self, etag, get_response):
+        def compute():
+            response = get_response()
+            if response.streaming:
+                return response, None
+            return response, (
+                response.status_code,
+                response.content,
+                response["Content-Type"],
+                response.get("ETag"),
+            )
+
+        (response, shared), is_coalesced = in_flight.do(etag, compute)
+        if not is_coalesced:
+            return response
+
+        if shared is None:
+            return get_response()
+
+        metrics.increment("coalesced_requests")
+        status, content, content_type, response_etag = shared
+        return self.make_response(content, content_type, response_etag, status=status)
+
+    def make_response(self, content, content_type, response_etag, status=200):
+        response = HttpResponse(content, status=status, content_type=content_type)
+        if response_etag:
+            response["ETag"] = response_etag
+        return response
+
+    def get_cached_response(self, etag):
+        if self.cache_alias is None:
+            return None
+
+        cached = caches[self.cache_alias].get(etag)
+        if cached is None:
+            metrics.increment("response_cache.misses")
+            return None
+
+        metrics.increment("response_cache.hits")
+        return self.make_response(*cached)
+
+    def cache_response(self, etag, response):
+        if self.cache_alias is None:
+            return
+
+        if response.status_code == 200 and not response.streaming:
+            caches[self.cache_alias].set(
+                etag, (response.content, response["Content-Type"], response.get("ETag"))
+            )
+
+
+class RESTFulObjectView(ConditionalRequestMixin, UpdateView, DetailView):
+    response_class = EncodedResponse
     model: Type[models.Model] = None
     app_name: str = None
 
+    def get(self, request, *args, **kwargs):
+        try:
+            self.object = self.get_object()
+        except FilterError as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
+        return self.render_to_response({})
+
+    def get_row_version(self):
+        model_fields = get_fields(self.model)
+
+        return versions.get_row_version(
+            self.model,
+            self.kwargs.get(self.pk_url_kwarg),
+            [
+                name
+                for name in self.fields or ()
+                if name in model_fields and model_fields[name].many_to_many
+            ],
+        )
+
+    # The detail ETag leads with the row version. Reads compare only the
+    # representation part and writes only the row part, so a tag from any
+    # representation of the row can be used for If-Match.
+    def get_response_tag(self, etag):
+        return '"{}-{}"'.format(self.get_row_version(), etag.strip('"'))
+
+    def get_read_tag(self, etag):
+        return '"{}"'.format(etag.strip('"').split("-")[-1])
+
+    def get_write_validators(self, request):
+        _, last_modified = super().get_validators(request)
+        return '"{}"'.format(self.get_row_version()), last_modified
+
+    def get_write_tag(self, etag):
+        return '"{}"'.format(etag.strip('"').split("-")[0])
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if self.request.method != "GET":
+            return queryset
+
+        query_plan = get_query_plan(
+            self.model, {}, fields=self.request.GET.getlist("fields") or self.fields
+        )
+        return apply_projection(queryset, query_plan)
+
     def render_to_response(self, context, **response_kwargs):
-        return self.response_class(
+        return self.render_data(
             {
                 "data": serialize_model_instance(
                     self.object,
@@ -170,20 +486,101 @@ class RESTFulObjectView(UpdateView, DetailView):
             args=(self.object.id,),
         )
 
+    def get_patch_data(self):
+        if self.request.content_type == "application/x-www-form-urlencoded":
+            return QueryDict(self.request.body, encoding=self.request.encoding)
+        return self.request.POST
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.POST, dict):
+            return self.render_data(
+                {"data": None, "error": "Request body must be an object."}, status=400
+            )
+
+        return super().post(request, *args, **kwargs)
+
+    def patch(self, request, *args, **kwargs):
+        # Django only parses form bodies for POST, so other encodings would
+        # arrive empty and update nothing.
+        if request.content_type not in PATCH_CONTENT_TYPES:
+            return self.render_data(
+                {
+                    "data": None,
+                    "error": "PATCH bodies must be one of {}.".format(
+                        ", ".join(PATCH_CONTENT_TYPES)
+                    ),
+                },
+                status=415,
+            )
+
+        data = self.get_patch_data()
+        if not isinstance(data, dict):
+            return self.render_data(
+                {"data": None, "error": "Request body must be an object."}, status=400
+            )
+
+        unknown_fields = [name for name in data if name not in self.fields]
+        if unknown_fields:
+            return self.render_data(
+                {
+                    "data": "NOT OK",
+                    "error": {name: ["Unknown field."] for name in unknown_fields},
+                }
+            )
+
+        model_fields = get_fields(self.model)
+        fields = [name for name in self.fields if name in data]
+        update_fields = [
+            name
+            for name in fields
+            if model_fields[name].concrete and not model_fields[name].many_to_many
+        ]
+
+        self.object = self.get_object(
+            self.get_queryset().only(self.model._meta.pk.name, *update_fields)
+        )
+
+        form = modelform_factory(
+            self.model, form=self.form_class or forms.ModelForm, fields=fields
+        )(data=data, instance=self.object)
+        if not form.is_valid():
+            return self.form_invalid(form)
+
+        self.object = form.save(commit=False)
+        if update_fields:
+            self.object.save(update_fields=update_fields)
+        form.save_m2m()
+
+        return self.render_data({"data": "OK", "error": None})
+
     def form_valid(self, form: forms.ModelForm):
-        return self.response_class({"data": "OK", "error": None})
+        self.object = form.save()
+
+        return self.render_data({"data": "OK", "error": None})
 
     def form_invalid(self, form: forms.ModelForm):
-        return self.response_class({"data": "NOT OK", "error": form.errors})
+        return self.render_data({"data": "NOT OK", "error": form.errors})
 
 
-class RESTFulListView(CreateView, ListView):
-    response_class = JsonResponse
+class RESTFulListView(
+    IdempotentPostMixin, ConditionalRequestMixin, CreateView, ListView
+):
+    response_class = EncodedResponse
     model: Type[models.Model] = None
     app_name: str = None
 
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except FilterError as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
     def get_queryset_operations(self, request_data):
-        return get_queryset_operations(self.model, request_data)
+        return get_queryset_operations(
+            self.model,
+            request_data,
+            fields=self.request.GET.getlist("fields") or self.fields,
+        )
 
     def get_queryset(self):
         queryset_operations = self.get_queryset_operations(
@@ -193,17 +590,27 @@ class RESTFulListView(CreateView, ListView):
                 if key not in ("fields",)
             }
         )
-        queryset = self.model.objects
+        queryset = self.model.objects.all()
 
         if queryset_operations["select_related"]:
-            queryset.select_related(*queryset_operations["select_related"])
+            queryset = queryset.select_related(*queryset_operations["select_related"])
 
         if queryset_operations["prefetch_related"]:
-            queryset.prefetch_related(*queryset_operations["prefetch_related"])
+            queryset = queryset.prefetch_related(
+                *queryset_operations["prefetch_related"]
+            )
 
         for condition in queryset_operations["filter"]:
             queryset = queryset.filter(condition)
 
+        if queryset_operations["order_by"]:
+            queryset = queryset.order_by(*queryset_operations["order_by"])
+
+        if queryset_operations["values"]:
+            return list(queryset.values(*queryset_operations["values"]).iterator())
+
+        queryset = queryset.only(*queryset_operations["only"])
+
         queryset = (
             queryset.all()
             if queryset_operations["prefetch_related"]
@@ -221,7 +628,7 @@ class RESTFulListView(CreateView, ListView):
         return object_list
 
     def render_to_response(self, context, **response_kwargs):
-        return self.response_class(
+        return self.render_data(
             {"data": context["object_list"], "error": None}, **response_kwargs
         )
 
@@ -231,30 +638,279 @@ class RESTFulListView(CreateView, ListView):
             args=(self.object.id if instance is None else instance.id,),
         )
 
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.POST, dict):
+            return self.render_data(
+                {"data": None, "error": "Request body must be an object."}, status=400
+            )
+
+        return super().post(request, *args, **kwargs)
+
     def form_valid(self, form: forms.ModelForm):
         self.object = form.save()
 
-        response = self.response_class({"data": "OK", "error": None})
+        response = self.render_data({"data": "OK", "error": None})
         response["Location"] = self.get_success_url(instance=form.instance)
         return response
 
     def form_invalid(self, form: forms.ModelForm):
-        return self.response_class({"data": "NOT OK", "error": form.errors})
+        return self.render_data({"data": "NOT OK", "error": form.errors})
+
+
+class RESTFulSearchView(ConditionalRequestMixin, ListView):
+    response_class = EncodedResponse
+    model: Type[models.Model] = None
+    app_name: str = None
+    fields = None
+    limit = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except FilterError as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
+    def get_dependencies(self):
+        return tuple(
+            dict.fromkeys(
+                super().get_dependencies() + search.get_dependencies(self.model)
+            )
+        )
+
+    def get_queryset(self):
+        try:
+            limit = min(
+                max(int(self.request.GET.get("limit", self.limit)), 0), self.limit
+            )
+        except ValueError:
+            limit = self.limit
+
+        object_ids = search.search(
+            self.model, self.request.GET.get("q", ""), limit=limit
+        )
+        query_plan = get_query_plan(
+            self.model, {}, fields=self.request.GET.getlist("fields") or self.fields
+        )
+        objects = apply_projection(self.model.objects.all(), query_plan).in_bulk(
+            object_ids
+        )
+
+        return [
+            serialize_model_instance(
+                objects[object_id],
+                show_fields=self.request.GET.getlist("fields") or self.fields,
+            )
+            for object_id in object_ids
+            if object_id in objects
+        ]
 
+    def render_to_response(self, context, **response_kwargs):
+        return self.render_data(
+            {"data": context["object_list"], "error": None}, **response_kwargs
+        )
+
+
+class RESTFulBatchView(ConditionalRequestMixin, View):
+    response_class = EncodedResponse
+    model: Type[models.Model] = None
+    app_name: str = None
+    fields = None
+    max_ids = 1000
+
+    def get(self, request, *args, **kwargs):
+        return self.render_batch(
+            [
+                object_id
+                for value in request.GET.getlist("ids")
+                for object_id in value.split(LIST_SEPARATOR)
+            ]
+        )
+
+    def post(self, request, *args, **kwargs):
+        data = request.POST
+        if isinstance(data, list):
+            object_ids = data
+        elif isinstance(data, QueryDict):
+            object_ids = [
+                object_id
+                for value in data.getlist("ids")
+                for object_id in value.split(LIST_SEPARATOR)
+            ]
+        elif isinstance(data, dict):
+            object_ids = data.get("ids") or []
+        else:
+            # A JSON scalar body is rejected by get_object_ids as a non-list.
+            object_ids = data
+
+        return self.render_batch(object_ids)
+
+    def get_object_ids(self, values):
+        pk = self.model._meta.pk
+
+        if not isinstance(values, list):
+            raise FilterError("ids must be a list.")
+        if len(values) > self.max_ids:
+            raise FilterError(
+                "At most {} ids can be fetched at once.".format(self.max_ids)
+            )
+
+        object_ids = []
+        for value in values:
+            if value == "":
+                continue
+            # to_python() would truncate 1.5 and accept true as 1.
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                raise FilterError("Invalid id {!r}.".format(value))
+            try:
+                object_ids.append(pk.to_python(value))
+            except ValidationError:
+                raise FilterError("Invalid id {!r}.".format(value))
+
+        return list(dict.fromkeys(object_ids))
+
+    def render_batch(self, values):
+        show_fields = self.request.GET.getlist("fields") or self.fields
+
+        try:
+            object_ids = self.get_object_ids(values)
+            query_plan = get_query_plan(self.model, {}, fields=show_fields)
+        except FilterError as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
+        # in_bulk() splits the lookup to stay under the backend's parameter limit.
+        objects = apply_projection(self.model.objects.all(), query_plan).in_bulk(
+            object_ids
+        )
+
+        return self.render_data(
+            {
+                "data": {
+                    str(object_id): serialize_model_instance(
+                        objects.get(object_id), show_fields=show_fields
+                    )
+                    for object_id in object_ids
+                },
+                "not_found": [
+                    object_id for object_id in object_ids if object_id not in objects
+                ],
+                "error": None,
+            }
+        )
+
+
+class RESTFulAggregateView(ConditionalRequestMixin, View):
+    response_class = EncodedResponse
+    model: Type[models.Model] = None
+    app_name: str = None
+    fields = None
+    max_groups = 1000
+
+    def get_dependencies(self):
+        paths = [
+            path
+            for name in (GROUP_BY_PARAMETER, *AGGREGATES)
+            for value in self.request.GET.getlist(name)
+            for path in value.split(LIST_SEPARATOR)
+        ]
+        paths.extend(self.request.GET.keys())
+
+        return get_dependencies(self.model, tuple(path for path in paths if path))
 
-def create_resource(app_name, model, fields):
+    def get(self, request, *args, **kwargs):
+        try:
+            aggregation_plan = get_aggregation_plan(
+                self.model, request.GET, allowed=self.fields
+            )
+            queryset_operations = get_queryset_operations(
+                self.model,
+                {
+                    key: value
+                    for key, value in request.GET.items()
+                    if key not in (GROUP_BY_PARAMETER, ORDERING_PARAMETER, *AGGREGATES)
+                },
+            )
+        except FilterError as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
+        queryset = self.model.objects.all()
+        for condition in queryset_operations["filter"]:
+            queryset = queryset.filter(condition)
+
+        annotations = dict(aggregation_plan.annotations)
+
+        if not aggregation_plan.group_by:
+            return self.render_data(
+                {"data": [queryset.aggregate(**annotations)], "error": None}
+            )
+
+        lookups = [lookup for _, lookup in aggregation_plan.group_by]
+        rows = (
+            queryset.values(*lookups)
+            .annotate(**annotations)
+            .order_by(*lookups)[: self.max_groups]
+        )
+
+        return self.render_data(
+            {
+                "data": [
+                    dict(
+                        {
+                            path: row[lookup]
+                            for path, lookup in aggregation_plan.group_by
+                        },
+                        **{name: row[name] for name in annotations},
+                    )
+                    for row in rows
+                ],
+                "error": None,
+            }
+        )
+
+
+def create_resource(app_name, model, fields, **options):
     name_plural = model._meta.verbose_name_plural.replace(" ", "_")
     name = model._meta.verbose_name.replace(" ", "_")
 
-    return [
+    urlpatterns = [
         path(
             "{}/".format(name_plural),
-            RESTFulListView.as_view(app_name=app_name, model=model, fields=fields),
+            RESTFulListView.as_view(
+                app_name=app_name, model=model, fields=fields, **options
+            ),
             name=name_plural,
         ),
         path(
             "{}/<int:pk>/".format(name_plural),
-            RESTFulObjectView.as_view(app_name=app_name, model=model, fields=fields),
+            RESTFulObjectView.as_view(
+                app_name=app_name, model=model, fields=fields, **options
+            ),
             name=name,
         ),
+        path(
+            "{}/batch/".format(name_plural),
+            RESTFulBatchView.as_view(
+                app_name=app_name, model=model, fields=fields, **options
+            ),
+            name=name_plural + "_batch",
+        ),
+        path(
+            "{}/aggregate/".format(name_plural),
+            RESTFulAggregateView.as_view(
+                app_name=app_name, model=model, fields=fields, **options
+            ),
+            name=name_plural + "_aggregate",
+        ),
     ]
+
+    if search.is_indexed(model):
+        urlpatterns.append(
+            path(
+                "{}/search/".format(name_plural),
+                RESTFulSearchView.as_view(
+                    app_name=app_name, model=model, fields=fields, **options
+                ),
+                name=name_plural + "_search",
+            )
+        )
+
+    return urlpatterns
@@ -8,3 +8,11 @@ class SalesChannelPaymentServiceAdmin(admin.ModelAdmin):
 
 
 admin.site.register(models.SalesChannelPaymentService, SalesChannelPaymentServiceAdmin)
+
+
+class GiftCardAdmin(admin.ModelAdmin):
+    exclude = ["balance_cents"]
+    readonly_fields = ["balance"]
+
+
+admin.site.register(models.GiftCard, GiftCardAdmin)
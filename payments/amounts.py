@@ -0,0 +1,17 @@
+from decimal import Decimal
+
+from django import forms
+
+CENT = Decimal("0.01")
+
+# Amounts accepted from clients follow the DecimalField(max_digits=9,
+# decimal_places=2) columns they end up in; NaN and infinities are rejected.
+AMOUNT_FIELD = forms.DecimalField(max_digits=9, decimal_places=2, min_value=CENT)
+
+
+def to_cents(amount) -> int:
+    return int(Decimal(str(amount)).quantize(CENT) / CENT)
+
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents) * CENT
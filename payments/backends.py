@@ -0,0 +1,43 @@
+from payments import giftcards
+from payments.models import SalesChannelPaymentService, Transaction
+
+
+class PaymentError(Exception):
+    pass
+
+
+class Backend:
+    def __init__(self, payment_service: SalesChannelPaymentService):
+        self.payment_service = payment_service
+
+    def capture(self, transaction: Transaction):
+        raise NotImplementedError
+
+    def cancel(self, transaction: Transaction):
+        raise NotImplementedError
+
+
+class GiftCardBackend(Backend):
+    def capture(self, transaction: Transaction):
+        pass
+
+    def cancel(self, transaction: Transaction):
+        try:
+            giftcards.refund(transaction)
+        except giftcards.GiftCardError as e:
+            raise PaymentError(str(e))
+
+
+backends = {SalesChannelPaymentService.GIFTCARD: GiftCardBackend}
+
+
+def get_backend(payment_service: SalesChannelPaymentService):
+    if payment_service is None:
+        raise PaymentError("Transaction has no payment service.")
+
+    if payment_service.payment_service not in backends:
+        raise PaymentError(
+            "Unknown payment service {!r}.".format(payment_service.payment_service)
+        )
+
+    return backends[payment_service.payment_service](payment_service)
@@ -0,0 +1,183 @@
+import queue
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import versions
+from core.jobs import Heartbeat
+from core.sqlite import retry_on_locked
+from payments import ledger
+from payments.backends import PaymentError, get_backend
+from payments.models import Transaction
+
+CHUNK_SIZE = 500
+CLAIM_TIMEOUT = timedelta(minutes=5)
+CLAIM_HEARTBEAT = timedelta(minutes=1)
+
+Action = namedtuple("Action", ["source", "pending", "target", "method"])
+
+ACTIONS = {
+    "capture": Action(
+        source=Transaction.AUTHORIZED,
+        pending=Transaction.PENDING_CAPTURE,
+        target=Transaction.CAPTURED,
+        method="capture",
+    ),
+    "cancel": Action(
+        source=Transaction.AUTHORIZED,
+        pending=Transaction.PENDING_CANCELLATION,
+        target=Transaction.CANCELLED,
+        method="cancel",
+    ),
+}
+
+
+def get_claim():
+    return uuid.uuid4().hex
+
+
+def get_claimed(claim):
+    return list(
+        Transaction.objects.filter(claim=claim)
+        .select_related("payment_service")
+        .order_by("pk")
+    )
+
+
+def move(claim, transactions, previous_status, status):
+    claimed_ids = set(
+        Transaction.objects.filter(
+            pk__in=[instance.pk for instance in transactions],
+            claim=claim,
+            status=previous_status,
+        ).values_list("pk", flat=True)
+    )
+    transactions = [instance for instance in transactions if instance.pk in claimed_ids]
+
+    Transaction.objects.filter(pk__in=claimed_ids).update(
+        status=status, claim="", claimed_at=None
+    )
+    versions.bump_version(Transaction)
+
+    for instance in transactions:
+        instance.status = status
+
+    ledger.record_events(
+        [
+            ledger.get_event(instance, previous_status=previous_status)
+            for instance in transactions
+        ]
+    )
+
+
+def request_transition(action: Action, transaction_ids):
+    accepted = []
+
+    transaction_ids = list(dict.fromkeys(transaction_ids))
+    for start in range(0, len(transaction_ids), CHUNK_SIZE):
+        claim = get_claim()
+
+        with transaction.atomic():
+            Transaction.objects.filter(
+                pk__in=transaction_ids[start : start + CHUNK_SIZE],
+                status=action.source,
+            ).update(status=action.pending, claim=claim, claimed_at=None)
+            versions.bump_version(Transaction)
+
+            claimed = get_claimed(claim)
+            ledger.record_events(
+                [
+                    ledger.get_event(instance, previous_status=action.source)
+                    for instance in claimed
+                ]
+            )
+
+        accepted.extend(instance.pk for instance in claimed)
+
+    accepted_ids = set(accepted)
+    rejected = [pk for pk in transaction_ids if pk not in accepted_ids]
+
+    return accepted, rejected
+
+
+def claim_chunk(action: Action, chunk_size=CHUNK_SIZE):
+    claim = get_claim()
+    now = timezone.now()
+
+    Transaction.objects.filter(
+        pk__in=Transaction.objects.filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - CLAIM_TIMEOUT),
+            status=action.pending,
+        ).values("pk")[:chunk_size],
+        status=action.pending,
+    ).update(claim=claim, claimed_at=now)
+
+    return claim, get_claimed(claim)
+
+
+@retry_on_locked
+def extend_claim(claim):
+    return Transaction.objects.filter(claim=claim).update(claimed_at=timezone.now())
+
+
+def process_transaction(action: Action, instance: Transaction):
+    try:
+        getattr(get_backend(instance.payment_service), action.method)(instance)
+        return None
+    except PaymentError as e:
+        return str(e)
+
+
+def run_worker(action: Action, pending: queue.SimpleQueue, errors):
+    # Each worker thread keeps its connection for the whole chunk and closes it
+    # once, instead of reconnecting for every transaction.
+    try:
+        while True:
+            try:
+                instance = pending.get_nowait()
+            except queue.Empty:
+                return
+            errors[instance.pk] = process_transaction(action, instance)
+    finally:
+        connections.close_all()
+
+
+@retry_on_locked
+def record_results(claim, action: Action, succeeded, failed):
+    with transaction.atomic():
+        if succeeded:
+            move(claim, succeeded, action.pending, action.target)
+        if failed:
+            move(claim, failed, action.pending, action.source)
+
+
+def process_chunk(action: Action, chunk_size=CHUNK_SIZE, workers=8):
+    claim, claimed = claim_chunk(action, chunk_size=chunk_size)
+    if not claimed:
+        return {}
+
+    pending = queue.SimpleQueue()
+    for instance in claimed:
+        pending.put(instance)
+
+    errors = {}
+    with Heartbeat(lambda: extend_claim(claim), CLAIM_HEARTBEAT.total_seconds()):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(run_worker, action, pending, errors)
+                for _ in range(min(workers, len(claimed)))
+            ]
+            for future in futures:
+                future.result()
+
+    succeeded = [instance for instance in claimed if errors[instance.pk] is None]
+    failed = [instance for instance in claimed if errors[instance.pk] is not None]
+
+    record_results(claim, action, succeeded, failed)
+
+    return {instance.pk: errors[instance.pk] for instance in claimed}
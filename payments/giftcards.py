@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from core.sqlite import retry_on_locked
+from payments.amounts import AMOUNT_FIELD, from_cents, to_cents
+from payments.models import (
+    GiftCard,
+    GiftCardEntry,
+    SalesChannelPaymentService,
+    Transaction,
+)
+
+
+class GiftCardError(Exception):
+    pass
+
+
+class GiftCardNotFound(GiftCardError):
+    pass
+
+
+class InsufficientBalance(GiftCardError):
+    pass
+
+
+def get_payment_service(sales_channel_id):
+    return SalesChannelPaymentService.objects.get(
+        sales_channel_id=sales_channel_id,
+        payment_service=SalesChannelPaymentService.GIFTCARD,
+    )
+
+
+def get_cents(amount):
+    try:
+        return to_cents(AMOUNT_FIELD.clean(amount))
+    except ValidationError as e:
+        raise GiftCardError("Invalid amount: {}".format(" ".join(e.messages)))
+
+
+def check_debit(code, currency):
+    gift_card = GiftCard.objects.filter(code=code).values("currency").first()
+
+    if gift_card is None:
+        raise GiftCardNotFound("Unknown gift card.")
+    if gift_card["currency"] != currency:
+        raise GiftCardError(
+            "Gift card is in {}, not {}.".format(gift_card["currency"], currency)
+        )
+    raise InsufficientBalance("Insufficient gift card balance.")
+
+
+def authorize(code, amount: Decimal, currency):
+    cents = get_cents(amount)
+
+    with transaction.atomic():
+        # Writing first takes SQLite's write lock up front, so concurrent
+        # authorizations wait on the busy timeout instead of failing to upgrade.
+        # Balances are integer cents, so the comparison and update are exact.
+        if not GiftCard.objects.filter(
+            code=code, currency=currency, balance_cents__gte=cents
+        ).update(balance_cents=F("balance_cents") - cents):
+            check_debit(code, currency)
+
+        gift_card = GiftCard.objects.only("sales_channel").get(code=code)
+
+        try:
+            payment_service = get_payment_service(gift_card.sales_channel_id)
+        except SalesChannelPaymentService.DoesNotExist:
+            raise GiftCardError("Gift cards are not enabled for this sales channel.")
+
+        authorization = Transaction.objects.create(
+            status=Transaction.AUTHORIZED,
+            amount=from_cents(cents),
+            currency=currency,
+            payment_service=payment_service,
+        )
+        GiftCardEntry.objects.create(
+            gift_card=gift_card,
+            type=GiftCardEntry.DEBIT,
+            amount_cents=cents,
+            transaction=authorization,
+        )
+
+    return authorization
+
+
+def credit(gift_card: GiftCard, amount: Decimal, authorization: Transaction = None):
+    cents = get_cents(amount)
+
+    with transaction.atomic():
+        GiftCardEntry.objects.create(
+            gift_card=gift_card,
+            type=GiftCardEntry.CREDIT,
+            amount_cents=cents,
+            transaction=authorization,
+        )
+        GiftCard.objects.filter(pk=gift_card.pk).update(
+            balance_cents=F("balance_cents") + cents
+        )
+
+
+def refund(authorization: Transaction):
+    debit = (
+        GiftCardEntry.objects.filter(
+            transaction=authorization, type=GiftCardEntry.DEBIT
+        )
+        .select_related("gift_card")
+        .first()
+    )
+    if debit is None:
+        return
+
+    try:
+        credit(debit.gift_card, debit.amount, authorization=authorization)
+    except IntegrityError:
+        pass
+
+
+def get_ledger_balance(gift_card: GiftCard):
+    totals = dict(
+        gift_card.entries.values_list("type")
+        .annotate(total=Sum("amount_cents"))
+        .order_by()
+    )
+
+    return from_cents(
+        totals.get(GiftCardEntry.CREDIT, 0) - totals.get(GiftCardEntry.DEBIT, 0)
+    )
+
+
+@retry_on_locked
+def reconcile(gift_card: GiftCard):
+    with transaction.atomic():
+        balance = get_ledger_balance(gift_card)
+        GiftCard.objects.filter(pk=gift_card.pk).update(balance_cents=to_cents(balance))
+
+    return balance
@@ -0,0 +1,125 @@
+from collections import defaultdict
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, pre_save
+
+from core import versions
+from payments.amounts import to_cents
+from payments.models import Transaction, TransactionEvent, TransactionRollup
+
+
+def get_hour(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def get_event(instance: Transaction, previous_status=""):
+    return TransactionEvent(
+        transaction_id=instance.pk,
+        previous_status=previous_status or "",
+        status=instance.status,
+        amount=instance.amount,
+        currency=instance.currency,
+    )
+
+
+def update_rollups(events: Iterable[TransactionEvent]):
+    totals = defaultdict(lambda: [0, 0])
+
+    # Rollups hold the net flow into each status per hour: a transition adds
+    # to its new status and takes the same transaction out of the old one.
+    for event in events:
+        hour = get_hour(event.timestamp)
+        cents = to_cents(event.amount)
+
+        total = totals[event.currency, event.status, hour]
+        total[0] += 1
+        total[1] += cents
+
+        if event.previous_status:
+            total = totals[event.currency, event.previous_status, hour]
+            total[0] -= 1
+            total[1] -= cents
+
+    for (currency, status, hour), (count, cents) in sorted(totals.items()):
+        if not count and not cents:
+            continue
+
+        queryset = TransactionRollup.objects.filter(
+            currency=currency, status=status, hour=hour
+        )
+        changes = {
+            "count": F("count") + count,
+            "amount_cents": F("amount_cents") + cents,
+        }
+        if not queryset.update(**changes):
+            TransactionRollup.objects.get_or_create(
+                currency=currency, status=status, hour=hour
+            )
+            queryset.update(**changes)
+
+
+def record_events(events: Iterable[TransactionEvent]):
+    events = list(events)
+
+    with transaction.atomic():
+        TransactionEvent.objects.bulk_create(events, batch_size=500)
+        update_rollups(events)
+
+        versions.bump_version(TransactionEvent)
+        versions.bump_version(TransactionRollup)
+
+    return events
+
+
+def rebuild_rollups():
+    with transaction.atomic():
+        TransactionRollup.objects.all().delete()
+
+        for start in range(0, TransactionEvent.objects.count(), 10000):
+            update_rollups(
+                TransactionEvent.objects.order_by("pk").only(
+                    "previous_status", "status", "amount", "currency", "timestamp"
+                )[start : start + 10000]
+            )
+
+        versions.bump_version(TransactionRollup)
+
+
+def remember_status(sender, instance, **kwargs):
+    instance._ledger_status = instance.__dict__.get("status")
+
+
+def load_previous_status(sender, instance, raw=False, **kwargs):
+    if (
+        raw
+        or instance._state.adding
+        or instance._ledger_status is not None
+        or "status" not in instance.__dict__
+    ):
+        return
+
+    instance._ledger_status = (
+        Transaction.objects.filter(pk=instance.pk)
+        .values_list("status", flat=True)
+        .first()
+    )
+
+
+def record_status_change(sender, instance, created, raw=False, **kwargs):
+    if raw or "status" not in instance.__dict__:
+        return
+
+    if created:
+        record_events([get_event(instance)])
+    elif instance._ledger_status != instance.status:
+        record_events([get_event(instance, previous_status=instance._ledger_status)])
+
+    instance._ledger_status = instance.status
+
+
+def connect_signals():
+    post_init.connect(remember_status, sender=Transaction)
+    pre_save.connect(load_previous_status, sender=Transaction)
+    post_save.connect(record_status_change, sender=Transaction)
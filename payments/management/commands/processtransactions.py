@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments import batches
+
+
+class Command(BaseCommand):
+    help = "Process pending transaction captures and cancellations in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--action", choices=list(batches.ACTIONS), action="append", dest="actions"
+        )
+        parser.add_argument("--chunk-size", type=int, default=batches.CHUNK_SIZE)
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--sleep", type=float, default=1.0)
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        actions = options["actions"] or list(batches.ACTIONS)
+
+        while True:
+            processed = 0
+
+            for name in actions:
+                results = batches.process_chunk(
+                    batches.ACTIONS[name],
+                    chunk_size=options["chunk_size"],
+                    workers=options["workers"],
+                )
+                processed += len(results)
+
+                if results:
+                    failed = sum(error is not None for error in results.values())
+                    self.stdout.write(
+                        "{}: {} processed, {} failed.".format(
+                            name, len(results), failed
+                        )
+                    )
+
+            if not processed:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
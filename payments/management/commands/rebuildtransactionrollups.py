@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from payments import ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly transaction rollups from the transaction ledger."
+
+    def handle(self, *args, **options):
+        ledger.rebuild_rollups()
+
+        self.stdout.write(self.style.SUCCESS("Rebuilt transaction rollups."))
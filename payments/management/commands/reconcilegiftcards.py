@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from payments import giftcards
+from payments.models import GiftCard
+
+
+class Command(BaseCommand):
+    help = "Recompute cached gift card balances from the gift card ledger."
+
+    def handle(self, *args, **options):
+        for gift_card in GiftCard.objects.iterator():
+            balance = giftcards.reconcile(gift_card)
+
+            if balance != gift_card.balance:
+                self.stdout.write(
+                    self.style.WARNING(
+                        "{}: {} -> {}".format(
+                            gift_card.code, gift_card.balance, balance
+                        )
+                    )
+                )
+
+        self.stdout.write(self.style.SUCCESS("Reconciled gift card balances."))
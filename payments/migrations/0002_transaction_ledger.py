@@ -0,0 +1,132 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "previous_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("pending authorization", "pending authorization"),
+                            ("authorized", "authorized"),
+                            ("pending capture", "pending capture"),
+                            ("captured", "captured"),
+                            ("pending cancellation", "pending cancellation"),
+                            ("cancelled", "cancelled"),
+                        ],
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending authorization", "pending authorization"),
+                            ("authorized", "authorized"),
+                            ("pending capture", "pending capture"),
+                            ("captured", "captured"),
+                            ("pending cancellation", "pending cancellation"),
+                            ("cancelled", "cancelled"),
+                        ],
+                        max_length=255,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=9)),
+                ("currency", models.CharField(max_length=255)),
+                ("timestamp", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TransactionRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("currency", models.CharField(max_length=255)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending authorization", "pending authorization"),
+                            ("authorized", "authorized"),
+                            ("pending capture", "pending capture"),
+                            ("captured", "captured"),
+                            ("pending cancellation", "pending cancellation"),
+                            ("cancelled", "cancelled"),
+                        ],
+                        max_length=255,
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=18),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["status", "timestamp"], name="payments_txn_status_ts"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["timestamp"], name="payments_txn_timestamp"),
+        ),
+        migrations.AddIndex(
+            model_name="transactionrollup",
+            index=models.Index(fields=["hour"], name="payments_txnrollup_hour"),
+        ),
+        migrations.AddConstraint(
+            model_name="transactionrollup",
+            constraint=models.UniqueConstraint(
+                fields=("currency", "status", "hour"),
+                name="payments_transactionrollup_currency_status_hour_unique",
+            ),
+        ),
+        migrations.AddField(
+            model_name="transactionevent",
+            name="transaction",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="events",
+                to="payments.Transaction",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionevent",
+            index=models.Index(
+                fields=["transaction", "timestamp"], name="payments_txnevent_txn_ts"
+            ),
+        ),
+    ]
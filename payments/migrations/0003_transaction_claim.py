@@ -0,0 +1,41 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_transaction_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="claim",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="payment_service",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="transactions",
+                to="payments.SalesChannelPaymentService",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["status", "claimed_at"], name="payments_txn_claim"
+            ),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_tableversion"),
+        ("payments", "0003_transaction_claim"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GiftCard",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(max_length=255, unique=True)),
+                ("currency", models.CharField(max_length=255)),
+                (
+                    "balance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=9),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "sales_channel",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="core.SalesChannel",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GiftCardEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[("credit", "credit"), ("debit", "debit")],
+                        max_length=255,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=9)),
+                ("timestamp", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "gift_card",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="entries",
+                        to="payments.GiftCard",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="gift_card_entries",
+                        to="payments.Transaction",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="giftcardentry",
+            index=models.Index(
+                fields=["gift_card", "timestamp"], name="payments_gcentry_card_ts"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="giftcardentry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(transaction__isnull=False),
+                fields=("transaction", "type"),
+                name="payments_giftcardentry_transaction_type_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="giftcard",
+            constraint=models.CheckConstraint(
+                check=models.Q(balance__gte=0),
+                name="payments_giftcard_balance_not_negative",
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.0.1 on 2026-10-19 20:02
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def rebuild_rollups(apps, schema_editor):
+    TransactionEvent = apps.get_model("payments", "TransactionEvent")
+    TransactionRollup = apps.get_model("payments", "TransactionRollup")
+    db_alias = schema_editor.connection.alias
+
+    # The old rollups never took transactions out of their previous status, so
+    # they are recomputed from the ledger rather than converted.
+    totals = defaultdict(lambda: [0, 0])
+    for event in TransactionEvent.objects.using(db_alias).order_by("pk").iterator():
+        hour = event.timestamp.replace(minute=0, second=0, microsecond=0)
+        cents = int(Decimal(str(event.amount)).quantize(Decimal("0.01")) * 100)
+
+        totals[event.currency, event.status, hour][0] += 1
+        totals[event.currency, event.status, hour][1] += cents
+        if event.previous_status:
+            totals[event.currency, event.previous_status, hour][0] -= 1
+            totals[event.currency, event.previous_status, hour][1] -= cents
+
+    TransactionRollup.objects.using(db_alias).all().delete()
+    TransactionRollup.objects.using(db_alias).bulk_create(
+        [
+            TransactionRollup(
+                currency=currency,
+                status=status,
+                hour=hour,
+                count=count,
+                amount_cents=cents,
+            )
+            for (currency, status, hour), (count, cents) in totals.items()
+            if count or cents
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0004_giftcard"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transactionrollup",
+            name="amount_cents",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RemoveField(
+            model_name="transactionrollup",
+            name="amount",
+        ),
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.0.1 on 2026-10-19 20:31
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def to_cents(amount):
+    return int(Decimal(str(amount)).quantize(Decimal("0.01")) * 100)
+
+
+def convert_amounts(apps, schema_editor):
+    GiftCard = apps.get_model("payments", "GiftCard")
+    GiftCardEntry = apps.get_model("payments", "GiftCardEntry")
+    db_alias = schema_editor.connection.alias
+
+    for gift_card in GiftCard.objects.using(db_alias).only("balance").iterator():
+        GiftCard.objects.using(db_alias).filter(pk=gift_card.pk).update(
+            balance_cents=to_cents(gift_card.balance)
+        )
+    for entry in GiftCardEntry.objects.using(db_alias).only("amount").iterator():
+        GiftCardEntry.objects.using(db_alias).filter(pk=entry.pk).update(
+            amount_cents=to_cents(entry.amount)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0005_transactionrollup_amount_cents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="giftcard",
+            name="balance_cents",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="giftcardentry",
+            name="amount_cents",
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(convert_amounts, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name="giftcard",
+            name="payments_giftcard_balance_not_negative",
+        ),
+        migrations.RemoveField(
+            model_name="giftcard",
+            name="balance",
+        ),
+        migrations.RemoveField(
+            model_name="giftcardentry",
+            name="amount",
+        ),
+        migrations.AddConstraint(
+            model_name="giftcard",
+            constraint=models.CheckConstraint(
+                check=models.Q(balance_cents__gte=0),
+                name="payments_giftcard_balance_not_negative",
+            ),
+        ),
+    ]
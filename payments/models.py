@@ -1,4 +1,7 @@
 from django.db import models
+from django.utils import timezone
+
+from payments.amounts import from_cents
 
 
 class SalesChannelPaymentService(models.Model):
@@ -45,3 +48,160 @@ class Transaction(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     amount = models.DecimalField(max_digits=9, decimal_places=2)
     currency = models.CharField(max_length=255)
+    payment_service = models.ForeignKey(
+        SalesChannelPaymentService,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="transactions",
+    )
+    claim = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "timestamp"],
+                name="payments_txn_status_ts",
+            ),
+            models.Index(fields=["timestamp"], name="payments_txn_timestamp"),
+            models.Index(fields=["status", "claimed_at"], name="payments_txn_claim"),
+        ]
+
+    def __str__(self):
+        return "{} {} ({})".format(self.amount, self.currency, self.status)
+
+
+class TransactionEvent(models.Model):
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.PROTECT, related_name="events"
+    )
+    previous_status = models.CharField(
+        max_length=255, choices=Transaction.STATUSES, blank=True
+    )
+    status = models.CharField(max_length=255, choices=Transaction.STATUSES)
+    amount = models.DecimalField(max_digits=9, decimal_places=2)
+    currency = models.CharField(max_length=255)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["transaction", "timestamp"],
+                name="payments_txnevent_txn_ts",
+            ),
+        ]
+
+    def __str__(self):
+        return "{} -> {} ({})".format(
+            self.previous_status or "-", self.status, self.transaction_id
+        )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Transaction events are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Transaction events are append-only.")
+
+
+class TransactionRollup(models.Model):
+    currency = models.CharField(max_length=255)
+    status = models.CharField(max_length=255, choices=Transaction.STATUSES)
+    hour = models.DateTimeField()
+    count = models.BigIntegerField(default=0)
+    amount_cents = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["currency", "status", "hour"],
+                name="payments_transactionrollup_currency_status_hour_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["hour"], name="payments_txnrollup_hour"),
+        ]
+
+    def __str__(self):
+        return "{} {} {}: {} ({})".format(
+            self.hour,
+            self.currency,
+            self.status,
+            from_cents(self.amount_cents),
+            self.count,
+        )
+
+
+class GiftCard(models.Model):
+    sales_channel = models.ForeignKey("core.SalesChannel", on_delete=models.PROTECT)
+    code = models.CharField(max_length=255, unique=True)
+    currency = models.CharField(max_length=255)
+    balance_cents = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(balance_cents__gte=0),
+                name="payments_giftcard_balance_not_negative",
+            ),
+        ]
+
+    def __str__(self):
+        return "{} ({} {})".format(self.code, self.balance, self.currency)
+
+    @property
+    def balance(self):
+        return from_cents(self.balance_cents)
+
+
+class GiftCardEntry(models.Model):
+    CREDIT = "credit"
+    DEBIT = "debit"
+
+    TYPES = ((CREDIT, CREDIT), (DEBIT, DEBIT))
+
+    gift_card = models.ForeignKey(
+        GiftCard, on_delete=models.PROTECT, related_name="entries"
+    )
+    type = models.CharField(max_length=255, choices=TYPES)
+    amount_cents = models.BigIntegerField()
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="gift_card_entries",
+    )
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["transaction", "type"],
+                condition=models.Q(transaction__isnull=False),
+                name="payments_giftcardentry_transaction_type_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["gift_card", "timestamp"], name="payments_gcentry_card_ts"
+            ),
+        ]
+
+    def __str__(self):
+        return "{} {} ({})".format(self.type, self.amount, self.gift_card_id)
+
+    @property
+    def amount(self):
+        return from_cents(self.amount_cents)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Gift card entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Gift card entries are append-only.")
@@ -0,0 +1,10 @@
+from core.jobs import task
+from payments import batches
+
+
+@task
+def process_transactions(action, chunk_size=batches.CHUNK_SIZE, workers=8):
+    while batches.process_chunk(
+        batches.ACTIONS[action], chunk_size=chunk_size, workers=workers
+    ):
+        pass
@@ -1,3 +1,352 @@
-from django.test import TestCase
+import json
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connections
+from django.test import Client, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.models import IdempotencyKey, Job, SalesChannel, TableVersion
+from payments import batches, giftcards, ledger
+from payments.models import (
+    GiftCard,
+    GiftCardEntry,
+    SalesChannelPaymentService,
+    Transaction,
+    TransactionEvent,
+    TransactionRollup,
+)
+
+
+def authorize(client, amount, key):
+    return client.post(
+        "/payments/giftcards/authorize/",
+        json.dumps({"code": "CARD", "amount": amount, "currency": "EUR"}),
+        content_type="application/json",
+        HTTP_IDEMPOTENCY_KEY=key,
+    )
+
+
+def create_gift_card(balance_cents, code="CARD"):
+    sales_channel = SalesChannel.objects.create(name="Sales channel")
+    SalesChannelPaymentService.objects.create(
+        name="Gift cards",
+        sales_channel=sales_channel,
+        payment_service=SalesChannelPaymentService.GIFTCARD,
+    )
+    return GiftCard.objects.create(
+        sales_channel=sales_channel,
+        code=code,
+        currency="EUR",
+        balance_cents=balance_cents,
+    )
+
+
+class GiftCardTests(TestCase):
+    def setUp(self):
+        self.gift_card = create_gift_card(30)
+
+    def test_debits_are_exact(self):
+        for _ in range(3):
+            giftcards.authorize("CARD", "0.10", "EUR")
+
+        self.gift_card.refresh_from_db()
+        self.assertEqual(self.gift_card.balance_cents, 0)
+        self.assertEqual(giftcards.get_ledger_balance(self.gift_card), Decimal("-0.30"))
+
+        with self.assertRaises(giftcards.InsufficientBalance):
+            giftcards.authorize("CARD", "0.01", "EUR")
+
+    def test_invalid_amounts(self):
+        for amount in ["NaN", "Infinity", "-Infinity", "0", "-1", "0.001", "1e9"]:
+            with self.subTest(amount=amount), self.assertRaises(
+                giftcards.GiftCardError
+            ):
+                giftcards.authorize("CARD", amount, "EUR")
+
+        self.gift_card.refresh_from_db()
+        self.assertEqual(self.gift_card.balance_cents, 30)
+
+    def test_refund_once(self):
+        authorization = giftcards.authorize("CARD", "0.20", "EUR")
+
+        giftcards.refund(authorization)
+        giftcards.refund(authorization)
+
+        self.gift_card.refresh_from_db()
+        self.assertEqual(self.gift_card.balance_cents, 30)
+        self.assertEqual(
+            GiftCardEntry.objects.filter(
+                transaction=authorization, type=GiftCardEntry.CREDIT
+            ).count(),
+            1,
+        )
+
+    def test_authorization_view(self):
+        client = Client(enforce_csrf_checks=True)
+
+        response = client.post(
+            "/payments/giftcards/authorize/",
+            json.dumps({"code": "CARD", "amount": "NaN", "currency": "EUR"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = client.post(
+            "/payments/giftcards/authorize/",
+            json.dumps({"code": "CARD", "amount": 0.1, "currency": "EUR"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.gift_card.refresh_from_db()
+        self.assertEqual(self.gift_card.balance_cents, 20)
+
+    def test_non_object_bodies(self):
+        for body in ["[]", '["CARD"]', "5", "null", '"CARD"']:
+            with self.subTest(body=body):
+                response = Client().post(
+                    "/payments/giftcards/authorize/",
+                    body,
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_malformed_body(self):
+        response = Client().post(
+            "/payments/giftcards/authorize/", "{bad", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_idempotent_authorization(self):
+        client = Client()
+
+        first = authorize(client, "0.10", "key")
+        second = authorize(client, "0.10", "key")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(authorize(client, "0.20", "key").status_code, 422)
+
+        self.gift_card.refresh_from_db()
+        self.assertEqual(self.gift_card.balance_cents, 20)
+
+    def test_failed_authorization_leaves_no_key(self):
+        client = Client(raise_request_exception=False)
+
+        with mock.patch.object(
+            GiftCardEntry.objects, "create", side_effect=RuntimeError
+        ):
+            self.assertEqual(authorize(client, "0.10", "key").status_code, 500)
+
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.gift_card.refresh_from_db()
+        self.assertEqual(self.gift_card.balance_cents, 30)
+
+        self.assertEqual(authorize(client, "0.10", "key").status_code, 200)
+
+
+class TransactionBatchTests(TestCase):
+    def setUp(self):
+        self.transactions = [
+            Transaction.objects.create(
+                status=Transaction.AUTHORIZED, amount=Decimal("1.00"), currency="EUR"
+            )
+            for _ in range(3)
+        ]
+
+    def post(self, body):
+        return Client().post(
+            "/payments/transactions/cancel/", body, content_type="application/json"
+        )
+
+    def get_version(self):
+        return (
+            TableVersion.objects.filter(label=Transaction._meta.label_lower)
+            .values_list("version", flat=True)
+            .first()
+        )
+
+    def test_invalid_ids(self):
+        pk = self.transactions[0].pk
+        for body in [
+            {"ids": str(pk)},
+            {"ids": [pk + 0.9]},
+            {"ids": [True]},
+            {"ids": [str(pk)]},
+            {"ids": pk},
+            pk,
+            "ids",
+            None,
+        ]:
+            with self.subTest(body=body):
+                self.assertEqual(self.post(json.dumps(body)).status_code, 400)
+
+        self.assertFalse(
+            Transaction.objects.exclude(status=Transaction.AUTHORIZED).exists()
+        )
+
+    def test_request_transition(self):
+        pk = self.transactions[0].pk
+        version = self.get_version()
+
+        response = self.post(json.dumps({"ids": [pk, 0]}))
+
+        data = json.loads(response.content)["data"]
+        self.assertEqual(data["accepted"], [pk])
+        self.assertEqual(data["rejected"], [0])
+        self.assertTrue(Job.objects.filter(pk=data["job"]).exists())
+        self.assertEqual(
+            Transaction.objects.get(pk=pk).status, Transaction.PENDING_CANCELLATION
+        )
+        self.assertGreater(self.get_version(), version or 0)
+
+    def test_process_chunk(self):
+        batches.request_transition(
+            batches.ACTIONS["capture"], [instance.pk for instance in self.transactions]
+        )
+
+        # Transactions without a payment service fail and go back to authorized.
+        results = batches.process_chunk(batches.ACTIONS["capture"], workers=2)
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(results.values()))
+        self.assertEqual(
+            Transaction.objects.filter(status=Transaction.AUTHORIZED).count(), 3
+        )
+        self.assertFalse(
+            TransactionRollup.objects.filter(
+                status=Transaction.PENDING_CAPTURE, count__gt=0
+            ).exists()
+        )
+
+    def test_extended_claims_are_kept(self):
+        action = batches.ACTIONS["cancel"]
+        batches.request_transition(action, [self.transactions[0].pk])
+        claim, claimed = batches.claim_chunk(action)
+        self.assertEqual(len(claimed), 1)
+
+        Transaction.objects.filter(claim=claim).update(
+            claimed_at=timezone.now() - batches.CLAIM_TIMEOUT * 2
+        )
+        self.assertEqual(batches.extend_claim(claim), 1)
+        self.assertEqual(batches.claim_chunk(action)[1], [])
+
+        Transaction.objects.filter(claim=claim).update(
+            claimed_at=timezone.now() - batches.CLAIM_TIMEOUT * 2
+        )
+        self.assertEqual(len(batches.claim_chunk(action)[1]), 1)
+        self.assertEqual(batches.extend_claim(claim), 0)
+
+
+class LedgerTests(TestCase):
+    def create(self, amount="0.10", status=Transaction.AUTHORIZED):
+        return Transaction.objects.create(
+            status=status, amount=Decimal(amount), currency="EUR"
+        )
+
+    def get_rollups(self):
+        return {
+            rollup.status: (rollup.count, rollup.amount_cents)
+            for rollup in TransactionRollup.objects.all()
+        }
+
+    def test_created(self):
+        for _ in range(3):
+            instance = self.create()
+
+        event = TransactionEvent.objects.filter(transaction=instance).get()
+        self.assertEqual((event.previous_status, event.status), ("", "authorized"))
+        self.assertEqual(self.get_rollups(), {Transaction.AUTHORIZED: (3, 30)})
+
+    def test_status_changes(self):
+        instance = self.create()
+        self.create("1.00")
+
+        instance.status = Transaction.CAPTURED
+        instance.save()
+        instance.save()
+
+        self.assertEqual(
+            list(
+                instance.events.order_by("pk").values_list("previous_status", "status")
+            ),
+            [
+                ("", Transaction.AUTHORIZED),
+                (Transaction.AUTHORIZED, Transaction.CAPTURED),
+            ],
+        )
+        self.assertEqual(
+            self.get_rollups(),
+            {Transaction.AUTHORIZED: (1, 100), Transaction.CAPTURED: (1, 10)},
+        )
+
+    def test_status_change_of_a_reloaded_instance(self):
+        instance = self.create()
+        instance = Transaction.objects.only("pk", "status").get(pk=instance.pk)
+        instance.status = Transaction.CANCELLED
+        instance.save(update_fields=["status"])
+
+        self.assertEqual(
+            self.get_rollups(),
+            {Transaction.AUTHORIZED: (0, 0), Transaction.CANCELLED: (1, 10)},
+        )
+
+    def test_append_only(self):
+        event = TransactionEvent.objects.get(transaction=self.create())
+
+        with self.assertRaises(ValueError):
+            event.save()
+        with self.assertRaises(ValueError):
+            event.delete()
+
+    def test_rebuild_rollups(self):
+        instance = self.create()
+        self.create("2.50")
+        instance.status = Transaction.CAPTURED
+        instance.save()
+        rollups = self.get_rollups()
+
+        TransactionRollup.objects.update(count=0, amount_cents=0)
+        ledger.rebuild_rollups()
+
+        self.assertEqual(self.get_rollups(), rollups)
+
+
+class ConcurrentGiftCardTests(TransactionTestCase):
+    def test_concurrent_debits(self):
+        gift_card = create_gift_card(100)
+
+        def authorize(_):
+            try:
+                giftcards.authorize("CARD", "0.10", "EUR")
+                return True
+            except giftcards.InsufficientBalance:
+                return False
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(authorize, range(20)))
+
+        gift_card.refresh_from_db()
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(gift_card.balance_cents, 0)
+        self.assertEqual(gift_card.entries.filter(type=GiftCardEntry.DEBIT).count(), 10)
+
+    def test_concurrent_idempotent_authorizations(self):
+        gift_card = create_gift_card(100)
+
+        def post(_):
+            try:
+                return authorize(Client(), "0.10", "key").content
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(post, range(8)))
+
+        gift_card.refresh_from_db()
+        self.assertEqual(len(set(responses)), 1)
+        self.assertEqual(gift_card.balance_cents, 90)
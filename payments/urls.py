@@ -0,0 +1,18 @@
+from django.urls import path
+
+from payments.views import GiftCardAuthorizationView, TransactionBatchView
+
+app_name = "payments"
+
+urlpatterns = [
+    path(
+        "giftcards/authorize/",
+        GiftCardAuthorizationView.as_view(),
+        name="gift_card_authorization",
+    ),
+    path(
+        "transactions/<str:action>/",
+        TransactionBatchView.as_view(),
+        name="transaction_batch",
+    ),
+]
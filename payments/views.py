@@ -1,3 +1,81 @@
-from django.shortcuts import render
+from django.http import Http404, QueryDict
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic.base import View
 
-# Create your views here.
+from core import jobs
+from core.views import IdempotentPostMixin, RESTFulMixin
+from payments import batches, giftcards, tasks
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class TransactionBatchView(IdempotentPostMixin, RESTFulMixin, View):
+    def post(self, request, action, *args, **kwargs):
+        if action not in batches.ACTIONS:
+            raise Http404("Unknown action {!r}.".format(action))
+
+        data = request.POST
+        if isinstance(data, QueryDict):
+            try:
+                transaction_ids = [int(pk) for pk in data.getlist("ids")]
+            except ValueError:
+                transaction_ids = None
+        elif isinstance(data, dict):
+            transaction_ids = data.get("ids", [])
+        else:
+            transaction_ids = data
+
+        # JSON ids must be real integers: strings would be walked character by
+        # character and floats truncated.
+        if not isinstance(transaction_ids, list) or not all(
+            type(pk) is int for pk in transaction_ids
+        ):
+            return self.render_data(
+                {"data": None, "error": "ids must be a list of integers."}, status=400
+            )
+
+        accepted, rejected = batches.request_transition(
+            batches.ACTIONS[action], transaction_ids
+        )
+
+        job = None
+        if accepted:
+            job = jobs.enqueue(tasks.process_transactions, args=[action]).pk
+
+        return self.render_data(
+            {
+                "data": {"accepted": accepted, "rejected": rejected, "job": job},
+                "error": None,
+            }
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class GiftCardAuthorizationView(IdempotentPostMixin, RESTFulMixin, View):
+    def post(self, request, *args, **kwargs):
+        data = request.POST
+        if not isinstance(data, dict):
+            return self.render_data(
+                {"data": None, "error": "Request body must be an object."}, status=400
+            )
+
+        try:
+            authorization = giftcards.authorize(
+                data.get("code", ""), data.get("amount"), data.get("currency", "")
+            )
+        except giftcards.GiftCardNotFound as e:
+            return self.render_data({"data": None, "error": str(e)}, status=404)
+        except giftcards.InsufficientBalance as e:
+            return self.render_data({"data": None, "error": str(e)}, status=402)
+        except giftcards.GiftCardError as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
+        return self.render_data(
+            {
+                "data": {
+                    "transaction": authorization.pk,
+                    "status": authorization.status,
+                },
+                "error": None,
+            }
+        )
@@ -1,11 +1,17 @@
 from django.conf import settings
 from django.contrib import admin
 
-from server.models import Server
+from server.models import Server, Subscription
+
+
+class SubscriptionInline(admin.TabularInline):
+    model = Subscription
+    extra = 0
 
 
 class ServerAdmin(admin.ModelAdmin):
     readonly_fields = ("last_known_status",)
+    inlines = [SubscriptionInline]
 
 
 if not settings.SERVER_OBJECT_TYPE:
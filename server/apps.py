@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ServerConfig(AppConfig):
     name = "server"
+
+    def ready(self):
+        from server import client, events
+
+        client.connect_signals()
+        events.autodiscover()
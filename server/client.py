@@ -0,0 +1,183 @@
+import re
+import threading
+import time
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from core import metrics
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRY_STATUSES = (502, 503, 504)
+
+lock = threading.Lock()
+clients = {}
+registry = {}
+
+
+class ServerNotFound(LookupError):
+    pass
+
+
+class CircuitOpen(requests.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            # Half open: let one request through and keep the others out until
+            # it reports back.
+            self.opened_at = time.monotonic()
+            return True
+
+    def succeed(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def fail(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class ServerClient:
+    def __init__(self, hostname):
+        self.hostname = hostname
+        self.metric = "server_client.{}".format(urlparse(hostname).netloc)
+        self.breaker = CircuitBreaker(
+            settings.SERVER_CLIENT_CIRCUIT_THRESHOLD,
+            settings.SERVER_CLIENT_CIRCUIT_RESET,
+        )
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = "Bearer {}".format(
+            settings.SERVER_API_TOKEN
+        )
+        self.session.mount(
+            hostname, HTTPAdapter(pool_maxsize=settings.SERVER_CLIENT_POOL_SIZE)
+        )
+
+    def request(self, method, path, retries=None, **kwargs):
+        method = method.upper()
+        url = urljoin(self.hostname, str(path))
+        kwargs.setdefault("timeout", settings.SERVER_CLIENT_TIMEOUT)
+
+        if retries is None:
+            retries = (
+                settings.SERVER_CLIENT_RETRIES if method in IDEMPOTENT_METHODS else 0
+            )
+
+        for attempt in range(retries + 1):
+            if attempt:
+                metrics.increment(self.metric + ".retries")
+                time.sleep(settings.SERVER_CLIENT_RETRY_DELAY * 2 ** (attempt - 1))
+
+            if not self.breaker.allow():
+                metrics.increment(self.metric + ".rejected")
+                raise CircuitOpen("Circuit open for {}.".format(self.hostname))
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.record(started, failed=True)
+                if attempt == retries:
+                    raise
+                continue
+
+            failed = response.status_code in RETRY_STATUSES
+            self.record(started, failed=failed)
+            if not failed or attempt == retries:
+                return response
+
+    def record(self, started, failed):
+        metrics.increment(self.metric + ".requests")
+        metrics.increment(self.metric + ".seconds", time.perf_counter() - started)
+
+        if failed:
+            metrics.increment(self.metric + ".errors")
+            self.breaker.fail()
+        else:
+            self.breaker.succeed()
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+
+def get_client(hostname):
+    if hasattr(hostname, "get_hostname"):
+        hostname = hostname.get_hostname()
+
+    with lock:
+        if hostname not in clients:
+            clients[hostname] = ServerClient(hostname)
+        return clients[hostname]
+
+
+def get_server_type(instance):
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", type(instance).__name__).lower()
+
+
+def resolve(server_type, object_id):
+    key = (server_type, str(object_id))
+
+    with lock:
+        hostname, expires = registry.get(key, (None, 0))
+    if time.monotonic() < expires:
+        return hostname
+
+    server = (
+        apps.get_model("server", "Server")
+        .objects.filter(type=server_type, object_id=str(object_id))
+        .exclude(scheme="")
+        .order_by("-last_known_status", "pk")
+        .first()
+    )
+    if server is None:
+        raise ServerNotFound(
+            "No server for {} {}.".format(server_type.replace("_", " "), object_id)
+        )
+
+    with lock:
+        registry[key] = (
+            server.get_hostname(),
+            time.monotonic() + settings.SERVER_REGISTRY_TTL,
+        )
+    return server.get_hostname()
+
+
+def for_object(instance):
+    return get_client(resolve(get_server_type(instance), instance.pk))
+
+
+def clear_registry(sender, **kwargs):
+    with lock:
+        registry.clear()
+
+
+def connect_signals():
+    Server = apps.get_model("server", "Server")
+
+    post_save.connect(clear_registry, sender=Server)
+    post_delete.connect(clear_registry, sender=Server)
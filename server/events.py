@@ -0,0 +1,188 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Min
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core import changes
+from core.models import ReplicationState
+from server import client
+from server.models import Event, EventCursor, Server
+
+BATCH_SIZE = 500
+TIMEOUT = 30
+BACKPRESSURE_STATUSES = (429, 503)
+
+handlers = defaultdict(list)
+
+
+def get_source():
+    if settings.SERVER_OBJECT_TYPE:
+        return "{}:{}".format(settings.SERVER_OBJECT_TYPE, settings.SERVER_OBJECT_ID)
+    return changes.CENTRAL
+
+
+def autodiscover():
+    autodiscover_modules("events")
+
+
+def handler(topic):
+    def register(func):
+        handlers[topic].append(func)
+        return func
+
+    return register
+
+
+def matches(topic, patterns):
+    return any(
+        pattern in ("*", topic)
+        or (pattern.endswith(".*") and topic.startswith(pattern[:-1]))
+        for pattern in patterns
+    )
+
+
+def publish(topic, payload=None):
+    return Event.objects.create(
+        source=get_source(),
+        topic=topic,
+        payload=json.dumps(payload, cls=DjangoJSONEncoder),
+    )
+
+
+def publish_many(topic, payloads):
+    return Event.objects.bulk_create(
+        [
+            Event(
+                source=get_source(),
+                topic=topic,
+                payload=json.dumps(payload, cls=DjangoJSONEncoder),
+            )
+            for payload in payloads
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def to_message(event: Event):
+    return {
+        "sequence": event.pk,
+        "topic": event.topic,
+        "payload": json.loads(event.payload or "null"),
+        "created": event.created.isoformat(),
+    }
+
+
+def get_retry_after(response):
+    try:
+        return int(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return settings.EVENT_RETRY_AFTER
+
+
+def deliver(server: Server, topics, batch_size=BATCH_SIZE):
+    source = get_source()
+    cursor, _ = EventCursor.objects.get_or_create(server=server, source=source)
+
+    if cursor.available_at is not None and cursor.available_at > timezone.now():
+        return 0
+
+    events = list(
+        Event.objects.filter(source=source, pk__gt=cursor.sequence).order_by("pk")[
+            :batch_size
+        ]
+    )
+    if not events:
+        return 0
+
+    messages = [to_message(event) for event in events if matches(event.topic, topics)]
+
+    # Batches without matching events are posted too, so the subscriber's
+    # sequence moves along with the cursor and the next batch lines up.
+    response = client.get_client(server).post(
+        reverse("server:events"),
+        json={
+            "source": source,
+            "after": cursor.sequence,
+            "through": events[-1].pk,
+            "events": messages,
+        },
+        timeout=TIMEOUT,
+    )
+
+    # A busy subscriber asks to be left alone for a while; the backlog
+    # stays in the outbox until it is ready again.
+    if response.status_code in BACKPRESSURE_STATUSES:
+        cursor.available_at = timezone.now() + timedelta(
+            seconds=get_retry_after(response)
+        )
+        cursor.save(update_fields=["available_at", "updated"])
+        return 0
+
+    if response.status_code != 409:
+        response.raise_for_status()
+
+    sequence = response.json()["data"]["sequence"]
+    delivered = sum(cursor.sequence < event.pk <= sequence for event in events)
+
+    cursor.sequence = sequence
+    cursor.available_at = None
+    cursor.save(update_fields=["sequence", "available_at", "updated"])
+
+    return delivered
+
+
+def get_subscribers():
+    return Server.objects.filter(subscriptions__isnull=False).distinct()
+
+
+def purge_delivered():
+    source = get_source()
+
+    subscribers = get_subscribers()
+    if subscribers.exclude(event_cursors__source=source).exists():
+        return 0
+
+    if subscribers.exists():
+        sequence = EventCursor.objects.filter(
+            server__in=subscribers, source=source
+        ).aggregate(sequence=Min("sequence"))["sequence"]
+    else:
+        sequence = Event.objects.filter(source=source).aggregate(sequence=Max("pk"))[
+            "sequence"
+        ]
+    if sequence is None:
+        return 0
+
+    deleted, _ = Event.objects.filter(source=source, pk__lte=sequence).delete()
+    return deleted
+
+
+def receive(source, after, through, messages):
+    key = "events:{}:{}".format(source, get_source())
+
+    if len(messages) > settings.EVENT_MAX_BATCH:
+        messages = messages[: settings.EVENT_MAX_BATCH]
+        through = messages[-1]["sequence"]
+
+    with transaction.atomic():
+        state, _ = ReplicationState.objects.get_or_create(source=key)
+        if state.sequence != after:
+            raise changes.SequenceMismatch(state.sequence)
+
+        for message in messages:
+            for topic, funcs in handlers.items():
+                if matches(message["topic"], [topic]):
+                    for func in funcs:
+                        func(source, message)
+
+        state.sequence = through
+        state.save(update_fields=["sequence"])
+
+    return state.sequence
@@ -0,0 +1,43 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+
+from server import events
+
+
+class Command(BaseCommand):
+    help = "Push events from this server's outbox to subscribing object servers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=events.BATCH_SIZE)
+        parser.add_argument("--sleep", type=float, default=1.0)
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = 0
+
+            for server in events.get_subscribers().prefetch_related("subscriptions"):
+                topics = [
+                    subscription.topic for subscription in server.subscriptions.all()
+                ]
+
+                try:
+                    count = events.deliver(
+                        server, topics, batch_size=options["batch_size"]
+                    )
+                except requests.RequestException as e:
+                    self.stderr.write("{}: {}".format(server, e))
+                    continue
+
+                if count:
+                    self.stdout.write("{}: {} events.".format(server, count))
+                delivered += count
+
+            events.purge_delivered()
+
+            if not delivered:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
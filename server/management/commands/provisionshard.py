@@ -0,0 +1,54 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from core import changes, shards
+from core.models import ReplicationState
+from server import replication
+from server.models import ReplicationCursor, Server
+
+
+class Command(BaseCommand):
+    help = "Create or refresh object server shard databases from the central database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("servers", nargs="*", type=int)
+
+    def handle(self, *args, **options):
+        servers = Server.objects.filter(shard=True)
+        if options["servers"]:
+            servers = Server.objects.filter(pk__in=options["servers"])
+
+        os.makedirs(settings.SHARD_DIR, exist_ok=True)
+
+        for server in servers:
+            alias = "shard_{}".format(server.pk)
+            shards.add_database(
+                alias, os.path.join(settings.SHARD_DIR, server.get_shard_name())
+            )
+
+            call_command("migrate", database=alias, verbosity=0)
+
+            sequence = replication.get_latest_sequence()
+            counts = shards.provision(alias, server.type, server.object_id)
+
+            ReplicationState.objects.using(alias).update_or_create(
+                source=changes.CENTRAL, defaults={"sequence": sequence}
+            )
+            ReplicationCursor.objects.update_or_create(
+                server=server, defaults={"sequence": sequence}
+            )
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Provisioned {} ({}).".format(
+                        server.get_shard_name(),
+                        ", ".join(
+                            "{} {}".format(count, label)
+                            for label, count in counts.items()
+                        ),
+                    )
+                )
+            )
@@ -0,0 +1,43 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+
+from server import replication
+from server.models import Server
+
+
+class Command(BaseCommand):
+    help = "Ship captured central changes to object server shards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=replication.BATCH_SIZE)
+        parser.add_argument("--sleep", type=float, default=1.0)
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        while True:
+            shipped = 0
+
+            for server in Server.objects.filter(shard=True):
+                try:
+                    count = replication.replicate(
+                        server, batch_size=options["batch_size"]
+                    )
+                except replication.ReprovisionRequired as e:
+                    self.stderr.write(self.style.ERROR(str(e)))
+                    continue
+                except requests.RequestException as e:
+                    self.stderr.write("{}: {}".format(server, e))
+                    continue
+
+                if count:
+                    self.stdout.write("{}: {} changes.".format(server, count))
+                shipped += count
+
+            replication.purge_replicated()
+
+            if not shipped:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("server", "0002_auto_20191220_0602"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="server",
+            name="shard",
+            field=models.BooleanField(default=False),
+        ),
+    ]
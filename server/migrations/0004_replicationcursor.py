@@ -0,0 +1,38 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("server", "0003_server_shard"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReplicationCursor",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sequence", models.BigIntegerField(default=0)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "server",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="replication_cursor",
+                        to="server.Server",
+                    ),
+                ),
+            ],
+        ),
+    ]
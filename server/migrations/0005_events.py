@@ -0,0 +1,99 @@
+# Generated by Django 3.0.1 on 2026-10-19 19:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("server", "0004_replicationcursor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Event",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=255)),
+                ("topic", models.CharField(max_length=255)),
+                ("payload", models.TextField(blank=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Subscription",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("topic", models.CharField(max_length=255)),
+                (
+                    "server",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subscriptions",
+                        to="server.Server",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="EventCursor",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=255)),
+                ("sequence", models.BigIntegerField(default=0)),
+                ("available_at", models.DateTimeField(blank=True, null=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "server",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="event_cursors",
+                        to="server.Server",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["source", "id"], name="server_event_source_id"),
+        ),
+        migrations.AddConstraint(
+            model_name="subscription",
+            constraint=models.UniqueConstraint(
+                fields=("server", "topic"),
+                name="server_subscription_server_topic_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="eventcursor",
+            constraint=models.UniqueConstraint(
+                fields=("server", "source"),
+                name="server_eventcursor_server_source_unique",
+            ),
+        ),
+    ]
@@ -2,7 +2,7 @@ import os
 import subprocess
 import sys
 
-from urllib.parse import ParseResult, urljoin
+from urllib.parse import ParseResult
 
 from django.db import models
 from django.conf import settings
@@ -14,6 +14,7 @@ import docker.errors
 import requests
 
 from core.models import Warehouse
+from server import client
 
 clients_cache = {}
 
@@ -73,6 +74,8 @@ class Server(models.Model):
         max_length=255, default=reverse_lazy("server:kill"), blank=True
     )
 
+    shard = models.BooleanField(default=False)
+
     wanted_status = models.CharField(max_length=255, choices=STATUSES, default=UP)
     last_known_status = models.CharField(
         max_length=255, choices=STATUSES, default=DOWN, editable=False
@@ -88,13 +91,24 @@ class Server(models.Model):
             fragment="",
         ).geturl()
 
+    def get_shard_name(self):
+        return "{}_{}.sqlite3".format(self.type, self.object_id)
+
+    def get_environment(self):
+        environment = {
+            "SERVER_OBJECT_TYPE": self.type,
+            "SERVER_OBJECT_ID": self.object_id,
+            "SERVER_API_TOKEN": settings.SERVER_API_TOKEN,
+        }
+        if self.shard:
+            environment["SERVER_SHARD"] = self.get_shard_name()
+        return environment
+
     def check_health(self):
         if self.scheme in ("http", "https"):
-            url = urljoin(self.get_hostname(), self.healthcheck_path)
-
             try:
-                requests.get(url)
-            except requests.ConnectionError:
+                client.get_client(self).get(self.healthcheck_path)
+            except requests.RequestException:
                 self.last_known_status = self.DOWN
             else:
                 self.last_known_status = self.UP
@@ -105,9 +119,7 @@ class Server(models.Model):
     def start(self):
         if self.backend == self.SUBPROCESS:
             env = os.environ.copy()
-            env.update(
-                {"SERVER_OBJECT_TYPE": self.type, "SERVER_OBJECT_ID": self.object_id}
-            )
+            env.update(self.get_environment())
             return subprocess.Popen(
                 [
                     sys.executable,
@@ -152,10 +164,7 @@ class Server(models.Model):
                     ports={"{port}/tcp".format(port=port): port},
                     volumes={settings.BASE_DIR: {"bind": "/mnt", "mode": "rw"}},
                     working_dir="/mnt",
-                    environment={
-                        "SERVER_OBJECT_TYPE": self.type,
-                        "SERVER_OBJECT_ID": self.object_id,
-                    },
+                    environment=self.get_environment(),
                     network_mode="host",
                 )
 
@@ -164,10 +173,8 @@ class Server(models.Model):
     def kill(self):
         if self.backend in (self.SUBPROCESS, self.DOCKER):
             if self.scheme in ("http", "https"):
-                kill_url = urljoin(self.get_hostname(), self.kill_path)
-
                 try:
-                    requests.get(kill_url)
+                    client.get_client(self).get(self.kill_path, retries=0)
                 except Exception:
                     return True
                 return False
@@ -178,3 +185,68 @@ class Server(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class ReplicationCursor(models.Model):
+    server = models.OneToOneField(
+        Server, on_delete=models.CASCADE, related_name="replication_cursor"
+    )
+    sequence = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "{} #{}".format(self.server, self.sequence)
+
+
+class Event(models.Model):
+    source = models.CharField(max_length=255)
+    topic = models.CharField(max_length=255)
+    payload = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["source", "id"], name="server_event_source_id"),
+        ]
+
+    def __str__(self):
+        return "#{} {} from {}".format(self.pk, self.topic, self.source)
+
+
+class Subscription(models.Model):
+    server = models.ForeignKey(
+        Server, on_delete=models.CASCADE, related_name="subscriptions"
+    )
+    topic = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["server", "topic"],
+                name="server_subscription_server_topic_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return "{} <- {}".format(self.server, self.topic)
+
+
+class EventCursor(models.Model):
+    server = models.ForeignKey(
+        Server, on_delete=models.CASCADE, related_name="event_cursors"
+    )
+    source = models.CharField(max_length=255)
+    sequence = models.BigIntegerField(default=0)
+    available_at = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["server", "source"],
+                name="server_eventcursor_server_source_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return "{} {} #{}".format(self.server, self.source, self.sequence)
@@ -0,0 +1,171 @@
+import json
+from collections import defaultdict
+
+from django.db.models import Max, Min
+from django.urls import reverse
+
+from core import changes, shards
+from core.models import (
+    Barcode,
+    ChangeEvent,
+    FulfillmentCenterArticle,
+    ReplicationState,
+)
+from server import client
+from server.models import ReplicationCursor, Server
+
+BATCH_SIZE = 500
+TIMEOUT = 30
+
+ARTICLE_LABEL = FulfillmentCenterArticle._meta.label_lower
+BARCODE_LABEL = Barcode._meta.label_lower
+REFERENCED_LABELS = tuple(model._meta.label_lower for model in shards.REFERENCED_MODELS)
+
+PURGED_SOURCE = "changes:purged"
+
+
+class ReprovisionRequired(Exception):
+    def __init__(self, server, sequence):
+        super().__init__(
+            "{} is at sequence {}, but changes up to {} were purged; "
+            "provision its shard again.".format(server, sequence, get_purged_sequence())
+        )
+        self.server = server
+        self.sequence = sequence
+
+
+def get_purged_sequence():
+    state = ReplicationState.objects.filter(source=PURGED_SOURCE).first()
+    return state.sequence if state else 0
+
+
+def get_latest_sequence():
+    return max(
+        ChangeEvent.objects.aggregate(sequence=Max("pk"))["sequence"] or 0,
+        get_purged_sequence(),
+    )
+
+
+def get_held_pks(server: Server, events):
+    pks = defaultdict(set)
+    for event in events:
+        if event.action == ChangeEvent.SAVE:
+            pks[event.label].add(event.object_id)
+
+    held = {}
+    for queryset in shards.get_shard_querysets(server.type, server.object_id):
+        label = queryset.model._meta.label_lower
+        if label in REFERENCED_LABELS:
+            held[label] = set(
+                queryset.filter(pk__in=pks[label]).values_list("pk", flat=True)
+            )
+    return held
+
+
+def is_relevant(change, held, fulfillment_center_ids):
+    if change["model"] == ARTICLE_LABEL:
+        return change["fields"].get("fulfillment_center") in fulfillment_center_ids
+
+    # A deleted row no longer tells which shards held it, and deleting a row a
+    # shard never held does nothing.
+    if change["model"] in REFERENCED_LABELS:
+        return (
+            change["action"] == ChangeEvent.DELETE
+            or change["pk"] in held[change["model"]]
+        )
+
+    return False
+
+
+def get_changes(server: Server, events):
+    held = get_held_pks(server, events)
+    fulfillment_center_ids = set(
+        shards.get_fulfillment_centers(server.type, server.object_id).values_list(
+            "pk", flat=True
+        )
+    )
+
+    relevant = []
+    for change in map(changes.to_change, events):
+        if is_relevant(change, held, fulfillment_center_ids):
+            if change["action"] == ChangeEvent.DELETE:
+                change["fields"] = {}
+            relevant.append(change)
+
+    # Barcodes saved before they were linked to one of the shard's articles
+    # were left out then, so they go along with the articles linking them.
+    barcode_pks = set()
+    for change in relevant:
+        if change["model"] == ARTICLE_LABEL and change["action"] == ChangeEvent.SAVE:
+            barcode_pks.update(change["fields"].get("barcodes", []))
+    barcode_pks -= {
+        change["pk"] for change in relevant if change["model"] == BARCODE_LABEL
+    }
+
+    return [
+        {
+            "sequence": events[0].pk,
+            "model": BARCODE_LABEL,
+            "pk": barcode.pk,
+            "action": ChangeEvent.SAVE,
+            "fields": json.loads(changes.serialize(barcode)),
+        }
+        for barcode in Barcode.objects.filter(pk__in=barcode_pks)
+    ] + relevant
+
+
+def replicate(server: Server, batch_size=BATCH_SIZE):
+    cursor, _ = ReplicationCursor.objects.get_or_create(server=server)
+
+    events = list(
+        ChangeEvent.objects.filter(pk__gt=cursor.sequence).order_by("pk")[:batch_size]
+    )
+    if not events:
+        return 0
+
+    response = client.get_client(server).post(
+        reverse("server:replication"),
+        json={
+            "source": changes.CENTRAL,
+            "after": cursor.sequence,
+            "through": events[-1].pk,
+            "changes": get_changes(server, events),
+        },
+        timeout=TIMEOUT,
+    )
+
+    # A replica that lost or skipped changes reports where it is; the next
+    # round resumes from there, unless the changes it needs are gone.
+    if response.status_code != 409:
+        response.raise_for_status()
+
+    sequence = response.json()["data"]["sequence"]
+    if response.status_code == 409 and sequence < get_purged_sequence():
+        raise ReprovisionRequired(server, sequence)
+
+    cursor.sequence = sequence
+    cursor.save(update_fields=["sequence", "updated"])
+
+    return len(events) if response.status_code != 409 else 0
+
+
+def purge_replicated():
+    servers = Server.objects.filter(shard=True)
+    if servers.filter(replication_cursor__isnull=True).exists():
+        return 0
+
+    # Without shards nothing consumes the outbox, so all of it goes.
+    if servers.exists():
+        sequence = servers.aggregate(sequence=Min("replication_cursor__sequence"))[
+            "sequence"
+        ]
+    else:
+        sequence = ChangeEvent.objects.aggregate(sequence=Max("pk"))["sequence"]
+    if sequence is None or sequence <= get_purged_sequence():
+        return 0
+
+    deleted, _ = ChangeEvent.objects.filter(pk__lte=sequence).delete()
+    ReplicationState.objects.update_or_create(
+        source=PURGED_SOURCE, defaults={"sequence": sequence}
+    )
+    return deleted
@@ -0,0 +1,8 @@
+from django.core.management import call_command
+
+from core.jobs import task
+
+
+@task
+def provision_shard(server_id):
+    call_command("provisionshard", server_id)
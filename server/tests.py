@@ -1,3 +1,581 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import changes, shards
+from core.models import (
+    Barcode,
+    ChangeEvent,
+    DeliveryCenter,
+    FulfillmentCenter,
+    FulfillmentCenterArticle,
+    Market,
+    SearchEntry,
+    Warehouse,
+)
+from core.routers import ShardRouter
+from server import client, events, replication, urls
+from server.models import Event, EventCursor, Server
+
+TOKEN = "test-token"
+
+
+@override_settings(SERVER_API_TOKEN=TOKEN)
+class ServerTestCase(TestCase):
+    def post_json(self, url, body, token=TOKEN):
+        extra = {"HTTP_AUTHORIZATION": "Bearer {}".format(token)} if token else {}
+        return self.client.post(
+            url, json.dumps(body), content_type="application/json", **extra
+        )
+
+
+class EventViewTests(ServerTestCase):
+    def setUp(self):
+        self.received = []
+        handlers = {
+            "article.*": [lambda source, message: self.received.append(message)]
+        }
+        patcher = mock.patch.dict(events.handlers, handlers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def publish(self, after, through, messages, **kwargs):
+        return self.post_json(
+            "/events/",
+            {
+                "source": "warehouse:1",
+                "after": after,
+                "through": through,
+                "events": messages,
+            },
+            **kwargs
+        )
+
+    def test_dispatches_events(self):
+        messages = [
+            {"sequence": 1, "topic": "article.saved", "payload": {"pk": 1}},
+            {"sequence": 2, "topic": "market.saved", "payload": None},
+        ]
+
+        response = self.publish(0, 2, messages)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["data"], {"sequence": 2})
+        self.assertEqual(self.received, messages[:1])
+
+        response = self.publish(0, 2, messages)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(self.received), 1)
+
+    def test_requires_token(self):
+        message = {"sequence": 1, "topic": "article.saved", "payload": None}
+
+        for token in (None, "wrong"):
+            with self.subTest(token=token):
+                response = self.publish(0, 1, [message], token=token)
+                self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.received, [])
+
+    def test_malformed_body(self):
+        response = self.client.post(
+            "/events/",
+            "{bad",
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer {}".format(TOKEN),
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_body(self):
+        self.assertEqual(self.post_json("/events/", {"after": 0}).status_code, 400)
+
+
+class DeliverTests(TestCase):
+    def setUp(self):
+        self.server = Server.objects.create(
+            name="Subscriber", type="warehouse", object_id="1", scheme="http"
+        )
+        self.events = [events.publish(topic) for topic in ("article.saved", "x.saved")]
+
+    def deliver(self, status_code=200, sequence=None, headers=None):
+        response = mock.Mock(status_code=status_code, headers=headers or {})
+        response.json.return_value = {"data": {"sequence": sequence}}
+
+        with mock.patch("server.client.get_client") as get_client:
+            get_client.return_value.post.return_value = response
+            delivered = events.deliver(self.server, ["article.*"])
+        return delivered, get_client.return_value.post.call_args
+
+    def test_delivers_matching_events(self):
+        delivered, call = self.deliver(sequence=self.events[-1].pk)
+
+        self.assertEqual(delivered, 2)
+        self.assertEqual(
+            [message["topic"] for message in call[1]["json"]["events"]],
+            ["article.saved"],
+        )
+        self.assertEqual(call[1]["json"]["through"], self.events[-1].pk)
+        self.assertEqual(
+            EventCursor.objects.get(server=self.server).sequence, self.events[-1].pk
+        )
+
+    def test_backpressure(self):
+        delivered, _ = self.deliver(status_code=503, headers={"Retry-After": "60"})
+
+        self.assertEqual(delivered, 0)
+        cursor = EventCursor.objects.get(server=self.server)
+        self.assertEqual(cursor.sequence, 0)
+        self.assertIsNotNone(cursor.available_at)
+        self.assertEqual(self.deliver()[0], 0)
+
+    def test_resumes_where_the_subscriber_is(self):
+        delivered, _ = self.deliver(status_code=409, sequence=self.events[0].pk)
+
+        self.assertEqual(delivered, 1)
+        self.assertEqual(
+            EventCursor.objects.get(server=self.server).sequence, self.events[0].pk
+        )
+        self.assertTrue(Event.objects.filter(pk=self.events[-1].pk).exists())
+
+
+class URLTests(TestCase):
+    def test_search_routes(self):
+        with override_settings(SERVER_OBJECT_TYPE="warehouse"):
+            self.addCleanup(importlib.reload, urls)
+            names = {pattern.name for pattern in importlib.reload(urls).urlpatterns}
+
+        self.assertIn("fulfillment_center_articles_search", names)
+        self.assertIn("sales_channel_supplier_articles_search", names)
+
+
+@mock.patch("server.views.SHARD_DATABASE", "default")
+class ReplicationViewTests(ServerTestCase):
+    def replicate(self, *changes, **kwargs):
+        return self.post_json(
+            "/replication/",
+            {"after": 0, "through": 1, "changes": list(changes)},
+            **kwargs
+        )
+
+    def test_requires_token(self):
+        change = {"model": "core.warehouse", "pk": 1, "action": "save", "fields": {}}
+
+        for token in (None, "wrong"):
+            with self.subTest(token=token):
+                response = self.replicate(change, token=token)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response["WWW-Authenticate"], "Bearer")
+        self.assertFalse(Warehouse.objects.exists())
+
+    def test_applies_changes(self):
+        response = self.replicate(
+            {
+                "model": "core.warehouse",
+                "pk": 7,
+                "action": "save",
+                "fields": {"name": "Replicated"},
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["data"], {"sequence": 1})
+        self.assertEqual(Warehouse.objects.get(pk=7).name, "Replicated")
+
+    def test_rejects_unreplicated_models(self):
+        for label in ("auth.user", "core.changeevent", "core.nothing", "nonsense"):
+            with self.subTest(label=label):
+                response = self.replicate(
+                    {
+                        "model": label,
+                        "pk": 1,
+                        "action": "save",
+                        "fields": {"username": "root"},
+                    }
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_rejects_unknown_actions(self):
+        response = self.replicate(
+            {"model": "core.warehouse", "pk": 1, "action": "drop", "fields": {}}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Warehouse.objects.exists())
+
+    def test_sequence_mismatch(self):
+        self.replicate()
+        response = self.replicate()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)["data"], {"sequence": 1})
+
+
+class ReplicationChangesTests(TestCase):
+    def setUp(self):
+        self.centers = [
+            FulfillmentCenter.objects.create(
+                warehouse=Warehouse.objects.create(name=name),
+                delivery_center=DeliveryCenter.objects.create(name=name),
+                name=name,
+            )
+            for name in ("One", "Two")
+        ]
+        self.servers = [
+            Server.objects.create(
+                name=center.name,
+                type="warehouse",
+                object_id=str(center.warehouse_id),
+                scheme="http",
+                netloc="localhost",
+                shard=True,
+            )
+            for center in self.centers
+        ]
+        self.barcode = Barcode.objects.create(barcode="4006381333931")
+        self.article = FulfillmentCenterArticle.objects.create(
+            fulfillment_center=self.centers[0], article_number="A1"
+        )
+        self.article.barcodes.add(self.barcode)
+        Market.objects.create()
+
+    def get_changes(self, server, after=0):
+        return [
+            (change["model"], change["pk"], change["action"])
+            for change in replication.get_changes(
+                server, list(ChangeEvent.objects.filter(pk__gt=after).order_by("pk"))
+            )
+        ]
+
+    def test_only_shard_rows(self):
+        center = self.centers[0]
+        rows = set(self.get_changes(self.servers[0]))
+
+        self.assertEqual(
+            rows,
+            {
+                ("core.warehouse", center.warehouse_id, "save"),
+                ("core.deliverycenter", center.delivery_center_id, "save"),
+                ("core.fulfillmentcenter", center.pk, "save"),
+                ("core.barcode", self.barcode.pk, "save"),
+                ("core.fulfillmentcenterarticle", self.article.pk, "save"),
+            },
+        )
+        self.assertNotIn("core.market", {model for model, _, _ in rows})
+
+        rows = set(self.get_changes(self.servers[1]))
+        self.assertNotIn("core.barcode", {model for model, _, _ in rows})
+        self.assertNotIn(
+            "core.fulfillmentcenterarticle", {model for model, _, _ in rows}
+        )
+
+    def test_moved_article_is_deleted_from_its_old_shard(self):
+        after = ChangeEvent.objects.latest("pk").pk
+        self.article.fulfillment_center = self.centers[1]
+        self.article.save()
+
+        self.assertEqual(
+            self.get_changes(self.servers[0], after),
+            [("core.fulfillmentcenterarticle", self.article.pk, "delete")],
+        )
+        self.assertEqual(
+            self.get_changes(self.servers[1], after),
+            [
+                ("core.barcode", self.barcode.pk, "save"),
+                ("core.fulfillmentcenterarticle", self.article.pk, "save"),
+            ],
+        )
+
+    def test_barcode_linked_after_replication(self):
+        barcode = Barcode.objects.create(barcode="5901234123457")
+        after = ChangeEvent.objects.latest("pk").pk
+        self.assertNotIn(
+            ("core.barcode", barcode.pk, "save"), self.get_changes(self.servers[0])
+        )
+
+        self.article.barcodes.add(barcode)
+        self.assertIn(
+            ("core.barcode", barcode.pk, "save"),
+            self.get_changes(self.servers[0], after),
+        )
+
+    def test_apply_moved_article(self):
+        after = ChangeEvent.objects.latest("pk").pk
+        self.article.fulfillment_center = self.centers[1]
+        self.article.save()
+
+        events = list(ChangeEvent.objects.filter(pk__gt=after))
+        changes.apply_changes(
+            "default",
+            "test",
+            0,
+            events[-1].pk,
+            replication.get_changes(self.servers[0], events),
+        )
+        self.assertFalse(
+            FulfillmentCenterArticle.objects.filter(pk=self.article.pk).exists()
+        )
+
+
+class ShardRouterTests(TestCase):
+    def test_routes_shard_models_to_the_shard(self):
+        router = ShardRouter()
+
+        self.assertIsNone(router.db_for_read(FulfillmentCenterArticle))
+
+        with mock.patch.dict(settings.DATABASES, shard={}):
+            for model in shards.SHARD_MODELS:
+                with self.subTest(model=model):
+                    self.assertEqual(router.db_for_read(model), "shard")
+                    self.assertEqual(router.db_for_write(model), "shard")
+            self.assertIsNone(router.db_for_read(Warehouse))
+            self.assertIsNone(router.db_for_write(Market))
+
+
+class ProvisionTests(TestCase):
+    def setUp(self):
+        self.center = FulfillmentCenter.objects.create(
+            warehouse=Warehouse.objects.create(name="One"),
+            delivery_center=DeliveryCenter.objects.create(name="One"),
+        )
+        other = FulfillmentCenter.objects.create(
+            warehouse=Warehouse.objects.create(name="Two"),
+            delivery_center=DeliveryCenter.objects.create(name="Two"),
+        )
+        self.article = FulfillmentCenterArticle.objects.create(
+            fulfillment_center=self.center, article_number="SHOE-42"
+        )
+        self.article.barcodes.add(Barcode.objects.create(barcode="4006381333931"))
+        FulfillmentCenterArticle.objects.create(
+            fulfillment_center=other, article_number="SOCK-1"
+        ).barcodes.add(Barcode.objects.create(barcode="5901234123457"))
+
+        self.alias = "shard_test"
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shards.add_database(self.alias, os.path.join(directory.name, "shard.sqlite3"))
+        self.addCleanup(connections.databases.pop, self.alias)
+        self.addCleanup(connections.__delitem__, self.alias)
+        self.addCleanup(lambda: connections[self.alias].close())
+        call_command("migrate", database=self.alias, verbosity=0)
+
+    def test_copies_only_the_shard_rows(self):
+        counts = shards.provision(
+            self.alias, "delivery_center", self.center.delivery_center_id
+        )
+
+        self.assertEqual(
+            counts,
+            {
+                "core.Warehouse": 1,
+                "core.DeliveryCenter": 1,
+                "core.FulfillmentCenter": 1,
+                "core.Barcode": 1,
+                "core.FulfillmentCenterArticle": 1,
+                "core.FulfillmentCenterArticle_barcodes": 1,
+            },
+        )
+        self.assertEqual(
+            list(
+                FulfillmentCenterArticle.objects.using(self.alias).values_list(
+                    "article_number", "barcodes__barcode"
+                )
+            ),
+            [("SHOE-42", "4006381333931")],
+        )
+        self.assertEqual(
+            SearchEntry.objects.using(self.alias).get().object_id, self.article.pk
+        )
+
+    def test_provisions_again(self):
+        shards.provision(self.alias, "fulfillment_center", self.center.pk)
+        self.article.delete()
+        shards.provision(self.alias, "fulfillment_center", self.center.pk)
+
+        self.assertFalse(FulfillmentCenterArticle.objects.using(self.alias).exists())
+        self.assertFalse(SearchEntry.objects.using(self.alias).exists())
+
+    def test_unknown_server_type(self):
+        counts = shards.provision(self.alias, "online_shop", self.center.pk)
+        self.assertEqual(set(counts.values()), {0})
+
+
+def make_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_and_half_opens(self):
+        breaker = client.CircuitBreaker(threshold=2, reset_timeout=30)
+
+        with mock.patch("server.client.time.monotonic", return_value=100):
+            breaker.fail()
+            self.assertTrue(breaker.allow())
+            breaker.fail()
+            self.assertFalse(breaker.allow())
+
+        with mock.patch("server.client.time.monotonic", return_value=131):
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+
+            breaker.fail()
+            self.assertFalse(breaker.allow())
+
+        with mock.patch("server.client.time.monotonic", return_value=162):
+            self.assertTrue(breaker.allow())
+            breaker.succeed()
+            self.assertTrue(breaker.allow())
+            self.assertTrue(breaker.allow())
+
+
+@override_settings(
+    SERVER_API_TOKEN=TOKEN,
+    SERVER_CLIENT_RETRIES=2,
+    SERVER_CLIENT_RETRY_DELAY=0,
+    SERVER_CLIENT_CIRCUIT_THRESHOLD=3,
+)
+class ServerClientTests(SimpleTestCase):
+    def setUp(self):
+        self.client = client.ServerClient("http://localhost:8001")
+        patcher = mock.patch.object(self.client.session, "request")
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sends_the_token(self):
+        self.assertEqual(
+            self.client.session.headers["Authorization"], "Bearer " + TOKEN
+        )
+
+        self.request.return_value = make_response(200)
+        self.client.get("/events/", params={"topic": "x"})
+
+        self.request.assert_called_once_with(
+            "GET",
+            "http://localhost:8001/events/",
+            params={"topic": "x"},
+            timeout=settings.SERVER_CLIENT_TIMEOUT,
+        )
+
+    def test_retries_idempotent_requests(self):
+        self.request.side_effect = [
+            make_response(503),
+            requests.ConnectionError(),
+            make_response(200),
+        ]
+
+        self.assertEqual(self.client.get("/").status_code, 200)
+        self.assertEqual(self.request.call_count, 3)
+
+    def test_returns_the_last_failure(self):
+        self.request.return_value = make_response(502)
+
+        self.assertEqual(self.client.get("/").status_code, 502)
+        self.assertEqual(self.request.call_count, 3)
+
+    def test_does_not_retry_posts(self):
+        self.request.return_value = make_response(504)
+
+        self.assertEqual(self.client.post("/").status_code, 504)
+        self.assertEqual(self.request.call_count, 1)
+
+        self.request.reset_mock()
+        self.request.side_effect = requests.Timeout()
+        with self.assertRaises(requests.Timeout):
+            self.client.post("/")
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_does_not_retry_client_errors(self):
+        self.request.return_value = make_response(400)
+
+        self.assertEqual(self.client.get("/").status_code, 400)
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_opens_the_circuit(self):
+        self.request.side_effect = requests.ConnectionError()
+
+        with self.assertRaises(requests.ConnectionError):
+            self.client.get("/")
+        with self.assertRaises(client.CircuitOpen):
+            self.client.get("/")
+        self.assertEqual(self.request.call_count, 3)
+
+
+class RegistryTests(TestCase):
+    def setUp(self):
+        client.clear_registry(sender=Server)
+        self.addCleanup(client.clear_registry, sender=Server)
+
+        self.warehouse = Warehouse.objects.create(name="One")
+        self.server = Server.objects.create(
+            name="One",
+            type="warehouse",
+            object_id=str(self.warehouse.pk),
+            scheme="http",
+            netloc="localhost:8001",
+        )
+
+    def test_get_server_type(self):
+        self.assertEqual(client.get_server_type(self.warehouse), "warehouse")
+        self.assertEqual(
+            client.get_server_type(FulfillmentCenter()), "fulfillment_center"
+        )
+
+    def test_resolves_and_caches(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                client.resolve("warehouse", self.warehouse.pk), "http://localhost:8001"
+            )
+            self.assertEqual(
+                client.resolve("warehouse", str(self.warehouse.pk)),
+                "http://localhost:8001",
+            )
+
+        self.assertIs(client.for_object(self.warehouse), client.get_client(self.server))
+
+    def test_prefers_servers_that_are_up(self):
+        Server.objects.create(
+            name="Two",
+            type="warehouse",
+            object_id=str(self.warehouse.pk),
+            scheme="http",
+            netloc="localhost:8002",
+        )
+        Server.objects.filter(netloc="localhost:8002").update(last_known_status="up")
+
+        self.assertEqual(
+            client.resolve("warehouse", self.warehouse.pk), "http://localhost:8002"
+        )
+
+    @override_settings(SERVER_REGISTRY_TTL=0)
+    def test_expires(self):
+        client.resolve("warehouse", self.warehouse.pk)
+        with self.assertNumQueries(1):
+            client.resolve("warehouse", self.warehouse.pk)
+
+    def test_saving_servers_clears_the_registry(self):
+        client.resolve("warehouse", self.warehouse.pk)
+
+        self.server.netloc = "localhost:8003"
+        self.server.save()
+        self.assertEqual(
+            client.resolve("warehouse", self.warehouse.pk), "http://localhost:8003"
+        )
+
+        self.server.delete()
+        with self.assertRaises(client.ServerNotFound):
+            client.resolve("warehouse", self.warehouse.pk)
+
+    def test_not_found(self):
+        Server.objects.create(
+            name="No scheme", type="delivery_center", object_id="1", scheme=""
+        )
+
+        for server_type, object_id in [("delivery_center", 1), ("warehouse", 0)]:
+            with self.subTest(server_type=server_type):
+                with self.assertRaises(client.ServerNotFound):
+                    client.resolve(server_type, object_id)
@@ -17,11 +17,17 @@ import os
 import signal
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.urls import path
 
-from core.models import Warehouse
+from core import metrics
+from core.models import (
+    FulfillmentCenterArticle,
+    SalesChannelSupplierArticle,
+    Warehouse,
+)
 from core.views import create_resource
+from server.views import EventView, ReplicationView
 
 
 def kill(request):
@@ -33,7 +39,22 @@ app_name = "server"
 urlpatterns = [
     path("health/", lambda request: HttpResponse("OK"), name="health"),
     path("kill/", kill, name="kill"),
+    path(
+        "metrics/", lambda request: JsonResponse(metrics.snapshot()), name="metrics"
+    ),
+    path("replication/", ReplicationView.as_view(), name="replication"),
+    path("events/", EventView.as_view(), name="events"),
 ]
 
 if settings.SERVER_OBJECT_TYPE:
     urlpatterns += create_resource(app_name=app_name, model=Warehouse, fields=["name"])
+    urlpatterns += create_resource(
+        app_name=app_name,
+        model=FulfillmentCenterArticle,
+        fields=["fulfillment_center", "article_number", "barcodes"],
+    )
+    urlpatterns += create_resource(
+        app_name=app_name,
+        model=SalesChannelSupplierArticle,
+        fields=["sales_channel", "supplier", "article_number", "price", "price_old"],
+    )
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.serializers.base import DeserializationError
+from django.db import OperationalError
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic.base import View
+
+from core import changes
+from core.models import ReplicationState
+from core.shards import SHARD_DATABASE
+from core.sqlite import is_locked_error
+from core.views import RESTFulMixin
+from server import events
+
+
+class ServerTokenRequiredMixin:
+    """
+    Accepts only requests from the central server and the servers it runs,
+    which send the shared SERVER_API_TOKEN.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        scheme, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+
+        if scheme.lower() != "bearer" or not constant_time_compare(
+            token, settings.SERVER_API_TOKEN
+        ):
+            response = self.render_data(
+                {"data": None, "error": "Missing or invalid server token."},
+                status=401,
+            )
+            response["WWW-Authenticate"] = "Bearer"
+            return response
+
+        return super().dispatch(request, *args, **kwargs)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ReplicationView(ServerTokenRequiredMixin, RESTFulMixin, View):
+    max_body_size = 64 * 1024 * 1024
+
+    def dispatch(self, request, *args, **kwargs):
+        if SHARD_DATABASE not in settings.DATABASES:
+            return self.render_data(
+                {"data": None, "error": "This server has no local database."},
+                status=404,
+            )
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        state = (
+            ReplicationState.objects.using(SHARD_DATABASE)
+            .filter(source=request.GET.get("source", changes.CENTRAL))
+            .first()
+        )
+
+        return self.render_data(
+            {"data": {"sequence": state.sequence if state else 0}, "error": None}
+        )
+
+    def post(self, request, *args, **kwargs):
+        data = request.POST
+
+        try:
+            sequence = changes.apply_changes(
+                SHARD_DATABASE,
+                data.get("source", changes.CENTRAL),
+                int(data["after"]),
+                int(data["through"]),
+                data.get("changes", []),
+            )
+        except changes.SequenceMismatch as e:
+            return self.render_data(
+                {"data": {"sequence": e.sequence}, "error": str(e)}, status=409
+            )
+        except (KeyError, TypeError, ValueError, DeserializationError) as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+
+        return self.render_data({"data": {"sequence": sequence}, "error": None})
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class EventView(ServerTokenRequiredMixin, RESTFulMixin, View):
+    max_body_size = 64 * 1024 * 1024
+
+    def post(self, request, *args, **kwargs):
+        data = request.POST
+
+        try:
+            sequence = events.receive(
+                data["source"],
+                int(data["after"]),
+                int(data["through"]),
+                data.get("events", []),
+            )
+        except changes.SequenceMismatch as e:
+            return self.render_data(
+                {"data": {"sequence": e.sequence}, "error": str(e)}, status=409
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            return self.render_data({"data": None, "error": str(e)}, status=400)
+        except OperationalError as e:
+            if not is_locked_error(e):
+                raise
+            response = self.render_data({"data": None, "error": str(e)}, status=503)
+            response["Retry-After"] = settings.EVENT_RETRY_AFTER
+            return response
+
+        return self.render_data({"data": {"sequence": sequence}, "error": None})